@@ -0,0 +1,281 @@
+import os
+
+
+# =====================================================
+# WORKSPACE CACHE
+# =====================================================
+
+# Memory budget for (index, metadata) pairs kept resident per process
+WORKSPACE_CACHE_MAX_BYTES = int(
+    os.getenv("WORKSPACE_CACHE_MAX_MB", "256")
+) * 1024 * 1024
+
+
+# =====================================================
+# CPU EXECUTOR
+# =====================================================
+
+# Threads for blocking work (embedding, FAISS search) kept off the event loop
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", "4"))
+
+
+# =====================================================
+# QUERY EMBEDDING BATCHER
+# =====================================================
+
+# How long the first query in a batch waits for others to join
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+# Largest batch sent to a single model.encode call
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+
+
+# =====================================================
+# QUERY EMBEDDING CACHE
+# =====================================================
+
+# Byte budget for cached query vectors (384 float32 = 1.5KB each)
+QUERY_CACHE_MAX_BYTES = int(
+    float(os.getenv("QUERY_CACHE_MAX_MB", "8")) * 1024 * 1024
+)
+
+
+# =====================================================
+# SEMANTIC ANSWER CACHE
+# =====================================================
+
+# Cosine similarity between query vectors needed to reuse an answer
+ANSWER_CACHE_MIN_SIMILARITY = float(os.getenv("ANSWER_CACHE_MIN_SIMILARITY", "0.95"))
+
+# Cached answers kept per workspace / workspaces kept per worker
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))
+ANSWER_CACHE_MAX_WORKSPACES = int(os.getenv("ANSWER_CACHE_MAX_WORKSPACES", "128"))
+
+# Answers older than this are never reused
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+
+# =====================================================
+# INGESTION JOBS
+# =====================================================
+
+# Background threads running parse / chunk / embed / index
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+
+# Persistent job table (survives restarts)
+INGEST_JOBS_DB = os.getenv("INGEST_JOBS_DB", "storage/jobs.db")
+
+# A running job whose owner has not renewed its lease for this long
+# (crashed / restarted process) is queued again
+INGEST_LEASE_SECONDS = float(os.getenv("INGEST_LEASE_SECONDS", "60"))
+INGEST_HEARTBEAT_SECONDS = float(os.getenv("INGEST_HEARTBEAT_SECONDS", "15"))
+
+
+# =====================================================
+# DOCUMENT PARSING (PROCESS POOL)
+# =====================================================
+
+# Worker processes for CPU-bound parsing (PyMuPDF, python-docx, pandas)
+PARSE_PROCESSES = int(os.getenv("PARSE_PROCESSES", str(min(4, os.cpu_count() or 1))))
+
+# Pages per parallel PDF task
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+
+# PDF page-range tasks in flight per file (bounds parsed text held in memory)
+PDF_TASKS_IN_FLIGHT = int(os.getenv("PDF_TASKS_IN_FLIGHT", str(PARSE_PROCESSES * 2)))
+
+
+# =====================================================
+# STREAMING INGESTION
+# =====================================================
+
+# Chunks embedded + indexed per batch (bounds peak memory per upload)
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "256"))
+
+# Upload size limit per file
+MAX_FILE_SIZE = int(float(os.getenv("MAX_FILE_SIZE_MB", "5")) * 1024 * 1024)
+
+
+# =====================================================
+# CHUNKING
+# =====================================================
+
+# "structured" (sentence / paragraph / heading aware) or "fixed" (char window)
+CHUNKER = os.getenv("CHUNKER", "structured")
+
+# Structured chunk size limit in (approximate) tokens; MiniLM reads 256 max
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "160"))
+
+# Trailing sentences repeated at the start of the next chunk
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+# Hard cap on structured chunk length in characters. Text without spaces
+# (CJK, base64, long identifiers) is cut into fixed windows under it
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "1500"))
+
+
+# =====================================================
+# ANN INDEX TIERS
+# =====================================================
+
+# Workspaces with at least this many vectors move from exact (flat) search to
+# IVF; they fall back to flat below half of it. IVF is retrained in the
+# background once a workspace has grown ~4x since training.
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", "20000"))
+
+# IVF lists probed per query (higher = better recall, slower search)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+
+
+# =====================================================
+# RETRIEVAL
+# =====================================================
+
+# Candidate chunks fetched per query (upper bound on chunks sent to the LLM)
+RETRIEVE_MAX_K = int(os.getenv("RETRIEVE_MAX_K", "5"))
+
+# Chunks below this cosine similarity are never sent to the LLM
+RETRIEVE_MIN_SIMILARITY = float(os.getenv("RETRIEVE_MIN_SIMILARITY", "0.25"))
+
+# Chunks further than this below the best hit are dropped (adaptive k)
+RETRIEVE_SCORE_MARGIN = float(os.getenv("RETRIEVE_SCORE_MARGIN", "0.15"))
+
+
+# =====================================================
+# VECTOR QUANTIZATION (OPT-IN)
+# =====================================================
+
+# "none" (float32, 1.5KB per chunk), "sq8" (8-bit scalar, ~4x smaller) or
+# "pq" (product quantization, PQ_SUBVECTORS bytes per chunk; IVF tier only,
+# smaller workspaces use sq8)
+INDEX_QUANTIZATION = os.getenv("INDEX_QUANTIZATION", "none").lower()
+
+# PQ sub-vectors per embedding (must divide 384)
+PQ_SUBVECTORS = int(os.getenv("PQ_SUBVECTORS", "48"))
+
+# Quantized hits re-scored with exact float32 vectors from the chunk store
+# (0 = off)
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+
+
+# =====================================================
+# COLD WORKSPACES (MMAP)
+# =====================================================
+
+# Open workspaces memory-mapped on first use: vectors are read from the
+# shared page cache instead of a private heap copy per worker
+WORKSPACE_MMAP = os.getenv("WORKSPACE_MMAP", "true").lower() in ("1", "true", "yes")
+
+# Queries after which a mapped workspace is copied onto the heap (0 = never)
+WORKSPACE_PROMOTE_HITS = int(os.getenv("WORKSPACE_PROMOTE_HITS", "50"))
+
+
+# =====================================================
+# HYBRID RETRIEVAL (BM25 + VECTORS)
+# =====================================================
+
+# Fuse SQLite FTS5 (BM25) hits with vector hits for exact ids / codes
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")
+
+# Lexical candidates taken into the fusion
+LEXICAL_CANDIDATES = int(os.getenv("LEXICAL_CANDIDATES", "5"))
+
+# Reciprocal rank fusion constant (higher flattens rank differences)
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Cosine floor for hits found by BM25 only (one shared word is enough to
+# match); below RETRIEVE_MIN_SIMILARITY so exact codes still get through
+LEXICAL_MIN_SIMILARITY = float(os.getenv("LEXICAL_MIN_SIMILARITY", "0.1"))
+
+# Words matching more chunks than this are too common to help and are left
+# out of the BM25 query (keeps its latency bounded on big workspaces)
+LEXICAL_MAX_MATCHES = int(os.getenv("LEXICAL_MAX_MATCHES", "1000"))
+
+
+# =====================================================
+# BATCH CHAT
+# =====================================================
+
+# Questions accepted by one /chat/batch request
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "200"))
+
+# LLM calls in flight per batch request when answers are generated
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
+
+# =====================================================
+# LLM CLIENT (POOLED, ONE PER WORKER)
+# =====================================================
+
+# Keep-alive connection pool to the LLM API
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+
+# Seconds to connect / to wait for a response (or the next streamed token)
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+
+# Retries on 429 / 5xx / connection errors (exponential backoff with jitter)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+
+# =====================================================
+# HEALTH PROBES (BACKGROUND, CACHED)
+# =====================================================
+
+# Seconds between background refreshes of /status
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "30"))
+
+# Per-probe timeout; the LLM probe lists models (no tokens billed)
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+
+
+# =====================================================
+# STARTUP (MODEL PRELOAD / LAZY IMPORTS)
+# =====================================================
+
+# eager      → load + warm the embedding model before serving
+# background → serve at once; /status/ready is 503 until warm
+# lazy       → load on first use
+EMBEDDING_PRELOAD = os.getenv("EMBEDDING_PRELOAD", "eager").lower()
+
+# Import faiss / pandas / fitz / sentence_transformers on first use
+LAZY_IMPORTS = os.getenv("LAZY_IMPORTS", "true").lower() in ("1", "true", "yes")
+
+
+# =====================================================
+# EMBEDDING BACKEND
+# =====================================================
+
+# torch → sentence-transformers on PyTorch
+# onnx  → same MiniLM weights on ONNX Runtime (exported once, cached).
+#         Refuses to load until scripts/check_onnx_parity.py has passed
+#         for the model file in ONNX_MODEL_DIR.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
+# int8 dynamic quantization of the ONNX weights (onnx backend only)
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "true").lower() in ("1", "true", "yes")
+
+# Where the exported / quantized model and tokenizer are kept
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "storage/models/all-MiniLM-L6-v2-onnx")
+
+
+# =====================================================
+# EMBEDDING WORKER POOL (MULTI-PROCESS)
+# =====================================================
+
+# Processes that own the embedding model; 0 → embed in the web process
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "0"))
+
+# Intra-op threads per worker; 0 → size of its CPU slice
+EMBED_WORKER_THREADS = int(os.getenv("EMBED_WORKER_THREADS", "0"))
+
+# Pin each worker to its own slice of the CPUs (Linux)
+EMBED_PIN_CPUS = os.getenv("EMBED_PIN_CPUS", "true").lower() in ("1", "true", "yes")
+
+# Large calls are split into sub-batches of at least this size across workers
+EMBED_POOL_MIN_BATCH = int(os.getenv("EMBED_POOL_MIN_BATCH", "32"))
+
+# Seconds a caller waits for one sub-batch
+EMBED_POOL_TIMEOUT = float(os.getenv("EMBED_POOL_TIMEOUT", "300"))
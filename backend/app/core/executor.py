@@ -0,0 +1,63 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+from app.config import CPU_EXECUTOR_WORKERS, PARSE_PROCESSES
+
+
+# Bounded pool shared by all requests in this worker.
+# numpy / FAISS / torch release the GIL, so threads overlap real work.
+_executor = ThreadPoolExecutor(
+    max_workers=CPU_EXECUTOR_WORKERS,
+    thread_name_prefix="cpu",
+)
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """
+    Runs a blocking call on the CPU executor
+    without stalling the event loop.
+    """
+
+    loop = asyncio.get_running_loop()
+
+    return await loop.run_in_executor(
+        _executor,
+        partial(fn, *args, **kwargs)
+    )
+
+
+# =====================================================
+# PROCESS POOL (GIL-BOUND WORK: DOCUMENT PARSING)
+# =====================================================
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Lazily started process pool.
+    Uses spawn — forking a process that already runs
+    ingestion threads is not safe.
+    """
+    global _process_pool
+
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PARSE_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+        return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+from app.config import HEALTH_PROBE_INTERVAL, HEALTH_PROBE_TIMEOUT
+from app.core.llm import llm_clients
+from app.core.logger import get_logger
+
+logger = get_logger("health")
+
+VECTOR_ROOT = "storage/vector_db"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class HealthProber:
+    """
+    Refreshes dependency status in the background; /status only
+    reads the cached result.
+
+    ✔ one probe round per HEALTH_PROBE_INTERVAL, whatever the poll rate
+    ✔ LLM probe lists models — no completion, no tokens billed
+    ✔ vector store probe is a filesystem check, no index read
+    ✔ every result carries checked_at and latency_ms
+    """
+
+    def __init__(self, interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+
+        self._task = None
+        self._checks = {
+            name: {"status": "unknown", "checked_at": None, "latency_ms": None}
+            for name in ("database", "llm")
+        }
+
+    # ---------- LIFECYCLE ----------
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        task, self._task = self._task, None
+
+        if task is not None:
+            task.cancel()
+
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    # ---------- PROBES ----------
+
+    async def refresh(self):
+        await asyncio.gather(
+            self._run("database", self._probe_database),
+            self._run("llm", self._probe_llm),
+        )
+
+    async def _run(self, name: str, probe):
+        started = time.perf_counter()
+        error = None
+
+        try:
+            await asyncio.wait_for(probe(), self.timeout)
+            status = "ok"
+
+        except Exception as e:
+            status = "unavailable"
+            error = str(e) or type(e).__name__
+
+            if self._checks[name]["status"] != "unavailable":
+                logger.warning(f"{name} health probe failed: {error}")
+
+        result = {
+            "status": status,
+            "checked_at": _now(),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+        if error:
+            result["error"] = error
+
+        self._checks[name] = result
+
+    async def _probe_database(self):
+        def check():
+            if not os.access(VECTOR_ROOT, os.R_OK | os.W_OK | os.X_OK):
+                raise RuntimeError(f"{VECTOR_ROOT} not readable / writable")
+
+            return shutil.disk_usage(VECTOR_ROOT).free
+
+        await asyncio.to_thread(check)
+
+    async def _probe_llm(self):
+        if not os.getenv("GROQ_API_KEY"):
+            raise RuntimeError("GROQ_API_KEY missing")
+
+        client = llm_clients.get_async().with_options(
+            max_retries=0,
+            timeout=self.timeout,
+        )
+
+        await client.models.list()
+
+    # ---------- READ ----------
+
+    def snapshot(self):
+        return {name: dict(result) for name, result in self._checks.items()}
+
+
+health_prober = HealthProber(HEALTH_PROBE_INTERVAL, HEALTH_PROBE_TIMEOUT)
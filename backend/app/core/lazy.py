@@ -0,0 +1,42 @@
+import importlib
+import threading
+
+from app.config import LAZY_IMPORTS
+
+
+class LazyModule:
+    """
+    Stands in for a heavy module until an attribute is first used,
+    so importing the app (and serving /ping) doesn't pay for it.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str):
+    """
+    LazyModule when LAZY_IMPORTS is on, the real module otherwise.
+    """
+
+    if not LAZY_IMPORTS:
+        return importlib.import_module(name)
+
+    return LazyModule(name)
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+
+import httpx
+from groq import AsyncGroq, Groq
+
+from app.config import (
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE,
+    LLM_KEEPALIVE_EXPIRY,
+    LLM_CONNECT_TIMEOUT,
+    LLM_READ_TIMEOUT,
+    LLM_MAX_RETRIES,
+)
+from app.core.logger import get_logger
+
+logger = get_logger("llm")
+
+
+def model_name() -> str:
+    return os.getenv("MODEL_NAME", "llama-3.1-8b-instant")
+
+
+class LLMClientManager:
+    """
+    App-lifetime Groq clients shared by chat, generation and health.
+
+    ✔ one keep-alive connection pool per worker (no TLS handshake per request)
+    ✔ configurable pool size, connect and read timeouts
+    ✔ retries on 429 / 5xx / connection errors with jittered
+      exponential backoff (SDK, honours Retry-After)
+    ✔ per-attempt HTTP latency and status counters
+
+    Set GROQ_BASE_URL to point every client at a local mock server.
+    """
+
+    def __init__(self):
+        self._async_client = None
+        self._sync_client = None
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.statuses = {}
+
+    # ---------- CLIENTS ----------
+
+    def get_async(self) -> AsyncGroq:
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    self._async_client = AsyncGroq(
+                        api_key=self._api_key(),
+                        timeout=self._timeout(),
+                        max_retries=LLM_MAX_RETRIES,
+                        http_client=httpx.AsyncClient(
+                            limits=self._limits(),
+                            timeout=self._timeout(),
+                            follow_redirects=True,
+                            event_hooks={
+                                "request": [self._on_request_async],
+                                "response": [self._on_response_async],
+                            },
+                        ),
+                    )
+
+        return self._async_client
+
+    def get_sync(self) -> Groq:
+        """
+        For blocking callers (thread pool, scripts).
+        """
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = Groq(
+                        api_key=self._api_key(),
+                        timeout=self._timeout(),
+                        max_retries=LLM_MAX_RETRIES,
+                        http_client=httpx.Client(
+                            limits=self._limits(),
+                            timeout=self._timeout(),
+                            follow_redirects=True,
+                            event_hooks={
+                                "request": [self._on_request],
+                                "response": [self._on_response],
+                            },
+                        ),
+                    )
+
+        return self._sync_client
+
+    async def aclose(self):
+        with self._lock:
+            async_client, self._async_client = self._async_client, None
+            sync_client, self._sync_client = self._sync_client, None
+
+        if async_client is not None:
+            await async_client.close()
+
+        if sync_client is not None:
+            sync_client.close()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "avg_ms": round(self.total_ms / self.requests, 2) if self.requests else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "statuses": dict(self.statuses),
+            "pool": {
+                "max_connections": LLM_MAX_CONNECTIONS,
+                "max_keepalive": LLM_MAX_KEEPALIVE,
+            },
+            "max_retries": LLM_MAX_RETRIES,
+        }
+
+    # ---------- INTERNAL ----------
+
+    @staticmethod
+    def _api_key() -> str:
+        api_key = os.getenv("GROQ_API_KEY")
+
+        if not api_key:
+            raise RuntimeError("GROQ_API_KEY missing")
+
+        return api_key
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        )
+
+    @staticmethod
+    def _timeout() -> httpx.Timeout:
+        return httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+    # every HTTP attempt (retries included); time to response headers
+    def _on_request(self, request: httpx.Request):
+        request.extensions["started"] = time.perf_counter()
+
+    def _on_response(self, response: httpx.Response):
+        started = response.request.extensions.get("started")
+
+        if started is None:
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self.requests += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.statuses[response.status_code] = (
+                self.statuses.get(response.status_code, 0) + 1
+            )
+
+        if response.status_code == 429 or response.status_code >= 500:
+            logger.warning(
+                f"LLM HTTP {response.status_code} after {elapsed_ms:.0f} ms "
+                f"(retries: up to {LLM_MAX_RETRIES})"
+            )
+
+    async def _on_request_async(self, request: httpx.Request):
+        self._on_request(request)
+
+    async def _on_response_async(self, response: httpx.Response):
+        self._on_response(response)
+
+
+# One pooled client set per worker process
+llm_clients = LLMClientManager()
@@ -0,0 +1,419 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.config import (
+    INGEST_HEARTBEAT_SECONDS,
+    INGEST_JOBS_DB,
+    INGEST_LEASE_SECONDS,
+    INGEST_WORKERS,
+)
+from app.core.logger import get_logger
+from app.documents.manager import ingest_document
+
+logger = get_logger("ingest_jobs")
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            TEXT PRIMARY KEY,
+    user_id       TEXT NOT NULL,
+    doc_id        TEXT NOT NULL,
+    filename      TEXT NOT NULL,
+    filepath      TEXT NOT NULL,
+    vector_path   TEXT NOT NULL,
+    status        TEXT NOT NULL,      -- queued | running | done | failed
+    stage         TEXT,
+    timings       TEXT NOT NULL DEFAULT '{}',
+    result        TEXT,
+    error         TEXT,
+    owner         TEXT,               -- instance token of the running process
+    content_hash  TEXT,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+"""
+
+# columns added after the first release of jobs.db
+_ADDED_COLUMNS = {
+    "content_hash": "TEXT",
+    "owner": "TEXT",
+}
+
+# job databases whose schema this process has already created / upgraded
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+def _ensure_schema(db_path: str):
+    """
+    Creates / upgrades jobs.db once per path per process (and again
+    if the file was removed), not on every heartbeat, claim or poll.
+    """
+
+    if db_path in _ready and os.path.exists(db_path):
+        return
+
+    with _ready_lock:
+        if db_path in _ready and os.path.exists(db_path):
+            return
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+        conn = sqlite3.connect(db_path, timeout=30)
+
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+            conn.commit()
+        finally:
+            conn.close()
+
+        _ready.add(db_path)
+
+
+class IngestionQueue:
+    """
+    Persistent background ingestion queue.
+
+    ✔ jobs stored in SQLite → survive restarts
+    ✔ worker pool runs parse / chunk / embed / index
+    ✔ per-stage timings for status polling
+    ✔ atomic claim → one worker per job, even across processes
+    ✔ leases: running jobs are renewed by a heartbeat; a job whose
+      owner stopped renewing (crash, restart) is queued again
+    """
+
+    def __init__(self, db_path: str, workers: int, lease: float, heartbeat: float):
+        self.db_path = db_path
+        self.workers = workers
+        self.lease = lease
+        self.heartbeat = heartbeat
+
+        # unique per process start — PIDs repeat across container restarts
+        self.token = f"{os.getpid()}-{uuid.uuid4().hex}"
+
+        self._executor = None
+        self._lock = threading.Lock()
+
+        self._submitted = set()     # job ids handed to this executor
+        self._heartbeat_thread = None
+        self._stop = threading.Event()
+
+    # ---------- DB ----------
+
+    @contextmanager
+    def _connect(self):
+        _ensure_schema(self.db_path)
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+
+        columns = ", ".join(f"{k} = ?" for k in fields)
+
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ?",
+                [*fields.values(), job_id],
+            )
+
+    # ---------- LIFECYCLE ----------
+
+    def start(self):
+        """
+        Starts the worker pool and the lease heartbeat, and resumes
+        unfinished jobs. Called once, from the app lifespan.
+        """
+
+        self._ensure_executor()
+
+        with self._connect() as conn:
+            pending = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall()
+
+        for row in pending:
+            self._enqueue(row["id"])
+
+        if pending:
+            logger.info(f"Resumed {len(pending)} ingestion job(s)")
+
+        # running jobs of a previous process are requeued once their lease expires
+        with self._lock:
+            if self._heartbeat_thread is None:
+                self._stop = threading.Event()
+                self._heartbeat_thread = threading.Thread(
+                    target=self._heartbeat_loop,
+                    args=(self._stop,),
+                    name="ingest-heartbeat",
+                    daemon=True,
+                )
+                self._heartbeat_thread.start()
+
+    def shutdown(self, wait: bool = False):
+        """
+        Stops the pool; queued jobs stay queued and resume on next
+        start. With wait, jobs already running are finished first.
+        """
+
+        self._stop.set()
+
+        with self._lock:
+            self._heartbeat_thread = None
+            executor, self._executor = self._executor, None
+            self._submitted.clear()
+
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _ensure_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="ingest",
+                )
+
+    def _enqueue(self, job_id: str):
+        with self._lock:
+            if job_id in self._submitted or self._executor is None:
+                return
+
+            self._submitted.add(job_id)
+            self._executor.submit(self._run, job_id)
+
+    # ---------- LEASES ----------
+
+    def _heartbeat_loop(self, stop: threading.Event):
+        while not stop.wait(self.heartbeat):
+            try:
+                self._renew_and_reclaim()
+            except Exception:
+                logger.exception("Ingestion heartbeat failed")
+
+    def _renew_and_reclaim(self):
+        """
+        Renews the leases of this process's running jobs, requeues
+        running jobs whose lease expired, and picks up queued jobs
+        nobody has touched for a lease period (their process died
+        before running them).
+        """
+
+        now = time.time()
+        expired = now - self.lease
+
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET updated_at = ? "
+                "WHERE status = 'running' AND owner = ?",
+                (now, self.token),
+            )
+
+            lapsed = [
+                row["id"] for row in conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'running' AND updated_at < ?",
+                    (expired,),
+                )
+            ]
+
+            for job_id in lapsed:
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', owner = NULL, updated_at = ? "
+                    "WHERE id = ? AND status = 'running' AND updated_at < ?",
+                    (now, job_id, expired),
+                )
+
+            stale = [
+                row["id"] for row in conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' AND updated_at < ? "
+                    "ORDER BY created_at",
+                    (expired,),
+                )
+            ]
+
+        if lapsed:
+            logger.warning(f"Requeued {len(lapsed)} ingestion job(s) with expired leases")
+
+        for job_id in lapsed + stale:
+            self._enqueue(job_id)
+
+    # ---------- API ----------
+
+    def submit(
+        self,
+        user_id: str,
+        doc_id: str,
+        filename: str,
+        filepath: str,
+        vector_path: str,
+        content_hash: str = None,
+    ):
+        """
+        Queues an ingestion job, unless a queued / running job for the
+        same bytes in the same workspace exists — then that job is
+        returned instead. Lookup and insert share one write transaction,
+        so concurrent uploads of one file never both get a job.
+
+        Returns {job_id, doc_id, duplicate}.
+        """
+
+        job_id = str(uuid.uuid4())
+        now = time.time()
+
+        with self._connect() as conn:
+
+            # write lock before the lookup: a second submit waits here
+            conn.execute("BEGIN IMMEDIATE")
+
+            if content_hash:
+                active = conn.execute(
+                    "SELECT id, doc_id FROM jobs WHERE vector_path = ? "
+                    "AND content_hash = ? AND status IN ('queued', 'running') "
+                    "LIMIT 1",
+                    (vector_path, content_hash),
+                ).fetchone()
+
+                if active is not None:
+                    return {
+                        "job_id": active["id"],
+                        "doc_id": active["doc_id"],
+                        "duplicate": True,
+                    }
+
+            conn.execute(
+                "INSERT INTO jobs (id, user_id, doc_id, filename, filepath, "
+                "vector_path, status, content_hash, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, user_id, doc_id, filename, filepath,
+                 vector_path, content_hash, now, now),
+            )
+
+        self._ensure_executor()
+        self._enqueue(job_id)
+
+        return {"job_id": job_id, "doc_id": doc_id, "duplicate": False}
+
+    def _row(self, job_id: str):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+
+    def get(self, job_id: str):
+
+        row = self._row(job_id)
+
+        if row is None:
+            return None
+
+        return {
+            "job_id": row["id"],
+            "user_id": row["user_id"],
+            "doc_id": row["doc_id"],
+            "filename": row["filename"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "timings_ms": json.loads(row["timings"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    # ---------- WORKER ----------
+
+    def _claim(self, job_id: str) -> bool:
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, "
+                "updated_at = ? WHERE id = ? AND status = 'queued'",
+                (self.token, time.time(), job_id),
+            )
+
+            return cursor.rowcount == 1
+
+    def _run(self, job_id: str):
+        try:
+            self._run_claimed(job_id)
+        finally:
+            with self._lock:
+                self._submitted.discard(job_id)
+
+    def _run_claimed(self, job_id: str):
+
+        if not self._claim(job_id):
+            return
+
+        job = self._row(job_id)
+
+        logger.info(f"[JOB {job_id}] Ingesting {job['filename']}")
+
+        def on_stage(stage, timings):
+            self._update(job_id, stage=stage, timings=json.dumps(timings))
+
+        try:
+            result = ingest_document(
+                doc_id=job["doc_id"],
+                filename=job["filename"],
+                filepath=job["filepath"],
+                vector_path=job["vector_path"],
+                on_stage=on_stage,
+                content_hash=job["content_hash"],
+            )
+
+            self._update(
+                job_id,
+                status="done",
+                stage=None,
+                timings=json.dumps(result["timings_ms"]),
+                result=json.dumps(result),
+            )
+
+            logger.info(
+                f"[JOB {job_id}] Done: {result['chunks']} chunks "
+                f"({result['deduplicated_chunks']} reused) "
+                f"{result['timings_ms']}"
+            )
+
+        except Exception as e:
+            logger.exception(f"[JOB {job_id}] Ingestion failed")
+
+            self._update(job_id, status="failed", error=str(e))
+
+            # the document never reached the index — drop the stored file
+            try:
+                os.remove(job["filepath"])
+            except OSError:
+                pass
+
+
+# Shared by the upload routes of this worker process
+ingest_queue = IngestionQueue(
+    INGEST_JOBS_DB,
+    INGEST_WORKERS,
+    INGEST_LEASE_SECONDS,
+    INGEST_HEARTBEAT_SECONDS,
+)
@@ -1,48 +1,43 @@
+import hashlib
 import os
-import faiss
+import time
 import uuid
+from itertools import islice
 
-from app.documents.parser import parse_file
-from app.utils.chunking import chunk_text
+import numpy as np
+
+from app.config import INGEST_EMBED_BATCH
+from app.documents.parser import iter_file
+from app.utils.chunking import chunk_segments
+from app.rag import store
 from app.rag.retrieve import (
-    load_metadata,
-    save_metadata,
-    save_index,
-    add_embeddings,
+    add_embedding_batches,
+    delete_embeddings,
+    lookup_vectors,
 )
 from app.rag.embed import embed_texts
 
 
+class FileTooLargeError(ValueError):
+    pass
+
+
 # ===============================
 # LIST DOCUMENTS
 # ===============================
 def list_documents(vector_path: str):
 
-    metadata = load_metadata(vector_path)
-
-    docs = {}
-    for m in metadata:
-        docs[m["doc_id"]] = m["document"]
-
-    return [
-        {"doc_id": k, "filename": v}
-        for k, v in docs.items()
-    ]
+    # documents table — no chunk scan
+    return store.list_documents(vector_path)
 
 
 # ===============================
-# FAST DELETE (NO VECTOR LOAD)
+# INCREMENTAL DELETE (ID-MAPPED)
 # ===============================
 def delete_document(doc_id: str, documents_path: str, vector_path: str):
 
-    metadata = load_metadata(vector_path)
-
-    remaining = [
-        m for m in metadata
-        if m["doc_id"] != doc_id
-    ]
-
-    if len(remaining) == len(metadata):
+    # remove this document's vectors only
+    if not delete_embeddings(doc_id, vector_path):
         return False
 
     # delete stored file
@@ -54,29 +49,20 @@ def delete_document(doc_id: str, documents_path: str, vector_path: str):
                 except:
                     pass
 
-    # recreate EMPTY index (FAST + SAFE)
-    index = faiss.IndexFlatL2(384)
-    save_index(index, vector_path)
-
-    save_metadata(remaining, vector_path)
-
     return True
 
 
 # ===============================
-# SAVE DOCUMENT
+# STORE UPLOAD
 # ===============================
-async def save_document(
-    upload_file,
-    documents_path: str,
-    vector_path: str,
-):
+async def store_upload(upload_file, documents_path: str, max_bytes: int):
     """
-    Fast ingestion pipeline (memory-safe streaming upload)
+    Writes the upload to disk and assigns its document id.
+    The size limit is enforced while streaming — the file is never
+    read into memory. Ingestion happens later in a background job.
     """
 
     os.makedirs(documents_path, exist_ok=True)
-    os.makedirs(vector_path, exist_ok=True)
 
     doc_id = str(uuid.uuid4())
     filename = upload_file.filename
@@ -89,47 +75,227 @@ async def save_document(
     # ===============================
     # ✅ STREAM FILE WRITE (FAST FIX)
     # ===============================
+    written = 0
+    digest = hashlib.sha256()
+
     with open(filepath, "wb") as buffer:
         while True:
             chunk = await upload_file.read(1024 * 1024)  # 1MB chunks
             if not chunk:
                 break
+
+            written += len(chunk)
+            digest.update(chunk)
+
+            if written > max_bytes:
+                break
+
             buffer.write(chunk)
 
-    # ---------- PARSE ----------
-    extracted_text = parse_file(filepath)
+    if written > max_bytes:
+        os.remove(filepath)
+        raise FileTooLargeError(f"File exceeds {max_bytes} bytes")
 
-    if not extracted_text or not extracted_text.strip():
-        raise ValueError("No readable text found")
+    return {
+        "id": doc_id,
+        "name": filename,
+        "path": filepath,
+        "content_hash": digest.hexdigest(),
+    }
 
-    # ---------- CHUNK ----------
-    chunks = chunk_text(extracted_text)
 
-    if not chunks:
-        raise ValueError("No valid chunks produced")
+# ===============================
+# CONTENT HASHING (DEDUP)
+# ===============================
+def text_hash(text: str) -> str:
+    """
+    Hash of whitespace- and case-normalized chunk text.
+    MiniLM is uncased, so these variants share one vector.
+    """
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
 
-    # ---------- EMBED ----------
-    vectors = embed_texts(chunks)
 
-    metadatas = [
-        {
-            "document": filename,
-            "text": chunk,
-            "doc_id": doc_id,
-        }
-        for chunk in chunks
-    ]
+def find_duplicate(vector_path: str, content_hash: str):
+    """
+    Already-indexed document with identical bytes, or None.
+    """
+    return store.find_document_by_hash(vector_path, content_hash)
 
-    # ---------- STORE ----------
-    add_embeddings(
-        vectors,
-        metadatas,
-        vector_path=vector_path
+
+def _embed_or_reuse(texts, hashes, vector_path: str, seen: dict):
+    """
+    Vectors for a batch: identical chunks already in the workspace
+    (or earlier in this upload) reuse their vector; the rest are
+    embedded in one call. Returns (vectors, reused_count).
+    """
+
+    found = {h: seen[h] for h in hashes if h in seen}
+    found.update(
+        lookup_vectors(vector_path, [h for h in hashes if h not in found])
+    )
+
+    # first occurrence of each unseen hash
+    missing = {}
+    for i, h in enumerate(hashes):
+        if h not in found:
+            missing.setdefault(h, i)
+
+    if missing:
+        embedded = embed_texts([texts[i] for i in missing.values()])
+
+        for row, h in enumerate(missing):
+            found[h] = embedded[row]
+
+    vectors = np.vstack([found[h] for h in hashes]).astype("float32")
+
+    seen.update(found)
+
+    return vectors, len(hashes) - len(missing)
+
+
+# ===============================
+# INGEST DOCUMENT (STREAMING)
+# ===============================
+def _timed(iterable, name: str, timings: dict):
+    """
+    Adds the time spent producing each item to timings[name].
+    """
+
+    iterator = iter(iterable)
+
+    while True:
+        start = time.perf_counter()
+
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            timings[name] = timings.get(name, 0) + (time.perf_counter() - start)
+
+        yield item
+
+
+def ingest_document(
+    doc_id: str,
+    filename: str,
+    filepath: str,
+    vector_path: str,
+    on_stage=None,
+    content_hash: str = None,
+):
+    """
+    Parse → chunk → embed → index a stored upload.
+    Blocking; runs on an ingestion worker.
+
+    Stages are streamed: pages flow into the chunker and chunks are
+    embedded INGEST_EMBED_BATCH at a time, so peak memory follows the
+    batch size, not the file size.
+
+    on_stage(stage, timings) is called as each batch moves through.
+    """
+
+    os.makedirs(vector_path, exist_ok=True)
+
+    # a job re-run after a worker crash starts from a clean slate
+    if store.get_chunk_ids(vector_path, doc_id):
+        delete_embeddings(doc_id, vector_path)
+
+    timings = {}
+    stats = {"chunks": 0, "text_length": 0, "deduplicated_chunks": 0}
+
+    # text_hash -> vector for chunks seen in this upload
+    seen_vectors = {}
+
+    def count_text(segments):
+        for page, segment in segments:
+            stats["text_length"] += len(segment)
+            yield page, segment
+
+    # ---------- PARSE → CHUNK (generators) ----------
+    segments = _timed(count_text(iter_file(filepath)), "parse", timings)
+    chunks = _timed(
+        (c for c in chunk_segments(segments) if c["text"].strip()),
+        "chunk",
+        timings,
     )
 
+    # ---------- EMBED (fixed-size batches) ----------
+    def batches():
+        while True:
+            batch = list(islice(chunks, INGEST_EMBED_BATCH))
+
+            if not batch:
+                return
+
+            if on_stage:
+                on_stage("embed", _as_ms(timings))
+
+            texts = [c["text"] for c in batch]
+            hashes = [text_hash(t) for t in texts]
+
+            start = time.perf_counter()
+            vectors, reused = _embed_or_reuse(
+                texts, hashes, vector_path, seen_vectors
+            )
+            timings["embed"] = timings.get("embed", 0) + (time.perf_counter() - start)
+
+            stats["chunks"] += len(batch)
+            stats["deduplicated_chunks"] += reused
+
+            yield vectors, [
+                {
+                    "document": filename,
+                    "text": chunk["text"],
+                    "doc_id": doc_id,
+                    "page": chunk["page"],
+                    "start": chunk["start"],
+                    "end": chunk["end"],
+                    "text_hash": h,
+                }
+                for chunk, h in zip(batch, hashes)
+            ]
+
+    if on_stage:
+        on_stage("parse", _as_ms(timings))
+
+    # ---------- STORE ----------
+    start = time.perf_counter()
+    add_embedding_batches(batches(), vector_path=vector_path)
+
+    # store time = total minus the upstream stages it drove
+    # ("chunk" already includes the parse time it pulled through)
+    upstream = timings.get("chunk", 0) + timings.get("embed", 0)
+    timings["index"] = max(0.0, time.perf_counter() - start - upstream)
+
+    if not stats["text_length"]:
+        raise ValueError("No readable text found")
+
+    if not stats["chunks"]:
+        raise ValueError("No valid chunks produced")
+
+    if content_hash:
+        store.set_content_hash(vector_path, doc_id, content_hash)
+
     return {
         "id": doc_id,
         "name": filename,
-        "chunks": len(chunks),
-        "text_length": len(extracted_text),
+        "chunks": stats["chunks"],
+        "text_length": stats["text_length"],
+        "deduplicated_chunks": stats["deduplicated_chunks"],
+        "timings_ms": _as_ms(timings),
     }
+
+
+def _as_ms(timings: dict):
+    """
+    Seconds → ms, with chunk time made exclusive of parse time.
+    """
+
+    exclusive = dict(timings)
+
+    if "chunk" in exclusive:
+        exclusive["chunk"] -= exclusive.get("parse", 0)
+
+    return {k: round(max(v, 0) * 1000, 2) for k, v in exclusive.items()}
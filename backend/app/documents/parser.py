@@ -1,8 +1,15 @@
-import fitz  # PyMuPDF
-from docx import Document
-import pandas as pd
 import os
 
+from collections import deque
+
+from app.config import PDF_PAGES_PER_TASK, PDF_TASKS_IN_FLIGHT
+from app.core.executor import get_process_pool
+from app.core.lazy import lazy_import
+
+fitz = lazy_import("fitz")  # PyMuPDF
+docx = lazy_import("docx")
+pd = lazy_import("pandas")
+
 
 def parse_file(filepath: str) -> str:
     ext = os.path.splitext(filepath)[1].lower()
@@ -24,21 +31,134 @@ def parse_file(filepath: str) -> str:
         raise ValueError("Unsupported file type")
 
 
+# ---------- STREAMING + PARALLEL (PROCESS POOL) ----------
+
+# text files are read in blocks, never whole
+TEXT_BLOCK_SIZE = 64 * 1024
+
+
+def iter_file(filepath: str):
+    """
+    Yields (page, text) pieces of the document, in order.
+    page is 1-based for PDFs and None for formats without pages.
+
+    ✔ PDF → page ranges parsed on the process pool, bounded in flight
+    ✔ TXT / MD → fixed-size blocks
+    ✔ DOCX / XLSX → parsed whole on the pool (libraries load the file anyway)
+
+    Blocking — call from an ingestion worker, not the event loop.
+    """
+
+    ext = os.path.splitext(filepath)[1].lower()
+
+    if ext == ".pdf":
+        yield from iter_pdf(filepath)
+
+    elif ext in [".txt", ".md"]:
+        for block in iter_text_file(filepath):
+            yield None, block
+
+    else:
+        yield None, get_process_pool().submit(parse_file, filepath).result()
+
+
+def iter_text_file(filepath: str):
+    with open(filepath, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(TEXT_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+
+
+def iter_pdf(filepath: str):
+    """
+    Page ranges fan out over the pool so a large PDF uses several
+    cores; only PDF_TASKS_IN_FLIGHT ranges are pending at once.
+    """
+
+    pool = get_process_pool()
+
+    with fitz.open(filepath) as doc:
+        page_count = doc.page_count
+
+    ranges = deque(
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    )
+
+    in_flight = deque()
+
+    while ranges or in_flight:
+        while ranges and len(in_flight) < PDF_TASKS_IN_FLIGHT:
+            start, stop = ranges.popleft()
+            in_flight.append((
+                start,
+                pool.submit(extract_pdf_pages, filepath, start, stop),
+            ))
+
+        start, future = in_flight.popleft()
+
+        for offset, text in enumerate(future.result()):
+            yield start + offset + 1, text
+
+
 # ---------- PDF ----------
 def parse_pdf(filepath):
-    text = ""
-    doc = fitz.open(filepath)
+    with fitz.open(filepath) as doc:
+        return parse_pdf_pages(filepath, 0, doc.page_count, doc=doc)
+
+
+def parse_pdf_pages(filepath, start: int, stop: int, doc=None):
+    """
+    Text of pages [start, stop).
+    Joined once — no quadratic string concatenation.
+    """
+    return "".join(extract_pdf_pages(filepath, start, stop, doc=doc))
 
-    for page in doc:
-        text += page.get_text()
 
-    return text
+def extract_pdf_pages(filepath, start: int, stop: int, doc=None):
+    """
+    Per-page text of pages [start, stop).
+    """
+
+    if doc is None:
+        with fitz.open(filepath) as doc:
+            return extract_pdf_pages(filepath, start, stop, doc=doc)
+
+    return [
+        doc[i].get_text()
+        for i in range(start, stop)
+    ]
 
 
 # ---------- WORD ----------
 def parse_docx(filepath):
-    doc = Document(filepath)
-    return "\n".join([p.text for p in doc.paragraphs])
+    """
+    Paragraphs separated by blank lines; Word headings become
+    markdown headings so the chunker can see section boundaries.
+    """
+
+    doc = docx.Document(filepath)
+
+    blocks = []
+
+    for p in doc.paragraphs:
+        text = p.text
+
+        if not text.strip():
+            continue
+
+        style = p.style.name if p.style is not None else ""
+
+        if style.startswith("Heading"):
+            level = style.replace("Heading", "").strip()
+            level = int(level) if level.isdigit() else 1
+            text = "#" * min(level, 6) + " " + text.strip()
+
+        blocks.append(text)
+
+    return "\n\n".join(blocks)
 
 
 # ---------- EXCEL ----------
@@ -1,9 +1,21 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routes import chat, upload, documents, health
+from app.routes import chat, upload, documents, health, keepalive
 from app.middleware.request_logger import RequestLoggingMiddleware
+from app.documents.jobs import ingest_queue
+from app.config import EMBEDDING_PRELOAD
+from app.core.executor import run_cpu, shutdown_process_pool
+from app.core.health import health_prober
+from app.core.llm import llm_clients
+from app.core.logger import get_logger
+from app.rag.embed import warmup_model
+from app.rag.embed_pool import embedding_pool
+
+logger = get_logger("startup")
 
 
 # ---------------- STORAGE ----------------
@@ -12,10 +24,53 @@ os.makedirs("storage/documents", exist_ok=True)
 os.makedirs("storage/vector_db", exist_ok=True)
 
 
+# ---------------- LIFESPAN ----------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+
+    # EMBED_WORKERS > 0 → the model is loaded in the pool, not here;
+    # started first so resumed ingestion jobs can embed
+    embedding_pool.start()
+
+    # resume ingestion jobs interrupted by the last restart
+    ingest_queue.start()
+
+    # dependency status for /status, refreshed off the request path
+    health_prober.start()
+
+    # embedding model: /status/ready stays 503 until it is warm
+    if EMBEDDING_PRELOAD == "eager":
+        await run_cpu(warmup_model)
+
+    elif EMBEDDING_PRELOAD == "background":
+        app.state.warmup = asyncio.create_task(_warmup_in_background())
+
+    elif EMBEDDING_PRELOAD != "lazy":
+        raise ValueError(f"Unknown EMBEDDING_PRELOAD: {EMBEDDING_PRELOAD}")
+
+    yield
+
+    await health_prober.stop()
+
+    # in-flight jobs finish before the pool they embed with goes away
+    await run_cpu(ingest_queue.shutdown, wait=True)
+    embedding_pool.shutdown()
+    shutdown_process_pool()
+    await llm_clients.aclose()
+
+
+async def _warmup_in_background():
+    try:
+        await run_cpu(warmup_model)
+    except Exception as e:
+        logger.error(f"Embedding model warmup failed: {e}")
+
+
 # ---------------- APP ----------------
 app = FastAPI(
     title="QuantumLeap AI API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -48,3 +103,4 @@ app.include_router(chat.router)
 app.include_router(upload.router)
 app.include_router(documents.router)
 app.include_router(health.router)
+app.include_router(keepalive.router)
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.config import (
+    ANSWER_CACHE_MIN_SIMILARITY,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_MAX_WORKSPACES,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+
+
+class SemanticAnswerCache:
+    """
+    Reuses LLM answers for near-identical questions.
+
+    ✔ scoped per workspace (vector_path)
+    ✔ match = same retrieved doc_id set + query cosine >= threshold
+    ✔ whole workspace dropped on upload / delete
+    ✔ LRU per workspace + TTL
+    """
+
+    def __init__(
+        self,
+        min_similarity: float,
+        max_entries: int,
+        max_workspaces: int,
+        ttl_seconds: int,
+    ):
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+        self.max_workspaces = max_workspaces
+        self.ttl = ttl_seconds
+
+        # vector_path -> OrderedDict[entry_id -> entry]
+        self._workspaces = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, vector_path: str, query_vector, doc_ids):
+        """
+        Returns the cached answer or None.
+        """
+
+        doc_ids = frozenset(doc_ids)
+        query = np.asarray(query_vector, dtype="float32").reshape(-1)
+        now = time.time()
+
+        with self._lock:
+            entries = self._workspaces.get(vector_path)
+
+            best_id, best_score = None, self.min_similarity
+
+            if entries:
+                self._workspaces.move_to_end(vector_path)
+
+                for entry_id, entry in list(entries.items()):
+
+                    if now - entry["created_at"] > self.ttl:
+                        del entries[entry_id]
+                        continue
+
+                    if entry["doc_ids"] != doc_ids:
+                        continue
+
+                    # vectors are L2-normalized → dot == cosine
+                    score = float(np.dot(entry["vector"], query))
+
+                    if score >= best_score:
+                        best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            entries.move_to_end(best_id)
+            self.hits += 1
+
+            return entries[best_id]["answer"]
+
+    def put(self, vector_path: str, query_vector, doc_ids, answer: str):
+
+        with self._lock:
+            entries = self._workspaces.setdefault(vector_path, OrderedDict())
+            self._workspaces.move_to_end(vector_path)
+
+            entries[self._next_id] = {
+                "vector": np.asarray(query_vector, dtype="float32").reshape(-1).copy(),
+                "doc_ids": frozenset(doc_ids),
+                "answer": answer,
+                "created_at": time.time(),
+            }
+            self._next_id += 1
+
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+            while len(self._workspaces) > self.max_workspaces:
+                self._workspaces.popitem(last=False)
+
+    def invalidate(self, vector_path: str):
+        with self._lock:
+            if self._workspaces.pop(vector_path, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "workspaces": len(self._workspaces),
+                "entries": sum(len(e) for e in self._workspaces.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "min_similarity": self.min_similarity,
+            }
+
+
+answer_cache = SemanticAnswerCache(
+    ANSWER_CACHE_MIN_SIMILARITY,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_MAX_WORKSPACES,
+    ANSWER_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,182 @@
+import asyncio
+import time
+
+import numpy as np
+
+from app.config import EMBED_BATCH_MAX_WAIT_MS, EMBED_BATCH_MAX_SIZE
+from app.core.executor import run_cpu
+from app.core.logger import get_logger
+from app.rag.embed import embed_texts, normalize_query, query_cache
+
+logger = get_logger("embed_batcher")
+
+
+class QueryEmbeddingBatcher:
+    """
+    Micro-batches concurrent query embeddings.
+
+    ✔ first query waits up to max_wait_ms for others to join
+    ✔ one model.encode call per batch (max_batch queries)
+    ✔ each caller gets its own (1, dim) vector back
+    ✔ batch size + queueing delay metrics
+    """
+
+    def __init__(self, max_wait_ms: float, max_batch: int):
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max(1, max_batch)
+
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+        self.batches = 0
+        self.queries = 0
+        self.max_batch_seen = 0
+        self.total_queue_delay = 0.0
+        self.max_queue_delay = 0.0
+
+    async def embed(self, text: str) -> np.ndarray:
+        self._ensure_worker()
+
+        future = self._loop.create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+
+        return await future
+
+    def stats(self):
+        return {
+            "max_wait_ms": self.max_wait * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": (
+                round(self.queries / self.batches, 2) if self.batches else 0.0
+            ),
+            "max_batch_size": self.max_batch_seen,
+            "avg_queue_delay_ms": (
+                round(self.total_queue_delay / self.queries * 1000, 2)
+                if self.queries else 0.0
+            ),
+            "max_queue_delay_ms": round(self.max_queue_delay * 1000, 2),
+        }
+
+    # ---------- INTERNAL ----------
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+
+        # queue + worker belong to the loop that created them
+        if self._loop is not loop or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - self._loop.time()
+
+            if timeout <= 0:
+                break
+
+            try:
+                batch.append(
+                    await asyncio.wait_for(self._queue.get(), timeout)
+                )
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+
+            started = time.perf_counter()
+            texts = [text for text, _, _ in batch]
+
+            try:
+                vectors = await run_cpu(embed_texts, texts)
+
+            except Exception as e:
+                logger.exception(f"Batch embedding failed ({len(texts)} queries)")
+
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for i, (_, future, _) in enumerate(batch):
+                if not future.done():
+                    future.set_result(vectors[i:i + 1])
+
+            # ---------- METRICS ----------
+            self.batches += 1
+            self.queries += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+            for _, _, enqueued in batch:
+                delay = started - enqueued
+                self.total_queue_delay += delay
+                self.max_queue_delay = max(self.max_queue_delay, delay)
+
+
+# One batcher per worker process
+query_batcher = QueryEmbeddingBatcher(
+    EMBED_BATCH_MAX_WAIT_MS,
+    EMBED_BATCH_MAX_SIZE,
+)
+
+
+async def embed_query(message: str) -> np.ndarray:
+    """
+    Embeds a single chat query.
+    Repeated queries are served from the vector cache,
+    everything else goes through the shared batcher.
+    """
+
+    key = normalize_query(message)
+
+    vector = query_cache.get(key)
+
+    if vector is not None:
+        return vector
+
+    vector = await query_batcher.embed(key)
+    query_cache.put(key, vector)
+
+    return vector
+
+
+async def embed_queries(messages) -> np.ndarray:
+    """
+    Embeds a list of queries as one (n, dim) matrix.
+    Cached vectors are reused; the rest go to the model in a single
+    call (already a batch, so the micro-batcher is bypassed).
+    """
+
+    keys = [normalize_query(m) for m in messages]
+
+    vectors = [query_cache.get(key) for key in keys]
+
+    missing = list(dict.fromkeys(
+        key for key, vector in zip(keys, vectors) if vector is None
+    ))
+
+    if missing:
+        embedded = await run_cpu(embed_texts, missing)
+
+        fresh = {}
+
+        for row, key in enumerate(missing):
+            fresh[key] = embedded[row:row + 1]
+            query_cache.put(key, fresh[key])
+
+        vectors = [
+            vector if vector is not None else fresh[key]
+            for key, vector in zip(keys, vectors)
+        ]
+
+    return np.vstack(vectors).astype("float32")
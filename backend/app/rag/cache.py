@@ -0,0 +1,155 @@
+import threading
+from collections import OrderedDict
+
+from app.config import WORKSPACE_CACHE_MAX_BYTES
+from app.core.logger import get_logger
+
+logger = get_logger("workspace_cache")
+
+
+class WorkspaceCache:
+    """
+    Process-wide LRU cache of loaded workspaces.
+
+    ✔ keyed by vector_path
+    ✔ evicts least recently used entries past the memory budget
+    ✔ entries dropped explicitly when a workspace is written
+    ✔ entries can be swapped for a reloaded value (mmap → heap)
+    ✔ hit / miss / eviction counters
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()   # vector_path -> (value, nbytes)
+        self._generations = {}          # vector_path -> write generation
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.refreshes = 0
+
+    def get(self, vector_path: str, loader):
+        """
+        Return the cached value for vector_path.
+
+        On a miss `loader(vector_path)` is called outside the lock and
+        must return `(value, nbytes)`.
+        """
+
+        with self._lock:
+            entry = self._entries.get(vector_path)
+
+            if entry is not None:
+                self._entries.move_to_end(vector_path)
+                self.hits += 1
+                return entry[0]
+
+            self.misses += 1
+            generation = self._generations.get(vector_path, 0)
+
+        value, nbytes = loader(vector_path)
+
+        with self._lock:
+            # a writer invalidated the workspace while we were loading
+            if self._generations.get(vector_path, 0) != generation:
+                return value
+
+            if nbytes > self.max_bytes:
+                logger.info(
+                    f"Workspace too large to cache: {vector_path} "
+                    f"({nbytes} bytes)"
+                )
+                return value
+
+            self._drop(vector_path)
+            self._entries[vector_path] = (value, nbytes)
+            self._bytes += nbytes
+            self._evict()
+
+        return value
+
+    def refresh(self, vector_path: str, loader) -> bool:
+        """
+        Replace a cached entry with `loader(vector_path)`.
+
+        Skipped when the entry was evicted or invalidated while loading,
+        or when the new value does not fit the budget.
+        """
+
+        with self._lock:
+            if vector_path not in self._entries:
+                return False
+
+            generation = self._generations.get(vector_path, 0)
+
+        value, nbytes = loader(vector_path)
+
+        with self._lock:
+            if (
+                self._generations.get(vector_path, 0) != generation
+                or vector_path not in self._entries
+                or nbytes > self.max_bytes
+            ):
+                return False
+
+            self._drop(vector_path)
+            self._entries[vector_path] = (value, nbytes)
+            self._bytes += nbytes
+            self.refreshes += 1
+            self._evict()
+
+        return True
+
+    def values(self):
+        with self._lock:
+            return [value for value, _ in self._entries.values()]
+
+    def invalidate(self, vector_path: str):
+        with self._lock:
+            self._generations[vector_path] = (
+                self._generations.get(vector_path, 0) + 1
+            )
+
+            if self._drop(vector_path):
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "refreshes": self.refreshes,
+            }
+
+    # ---------- INTERNAL (caller holds lock) ----------
+
+    def _drop(self, vector_path: str) -> bool:
+        entry = self._entries.pop(vector_path, None)
+
+        if entry is None:
+            return False
+
+        self._bytes -= entry[1]
+        return True
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+            self.evictions += 1
+
+
+# Shared by every request handled by this worker process
+workspace_cache = WorkspaceCache(WORKSPACE_CACHE_MAX_BYTES)
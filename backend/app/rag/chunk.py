@@ -1,14 +1,9 @@
+from app.utils.chunking import chunk_text
+
+
 def split_text(text, chunk_size=500, overlap=100):
     """
     Splits text into overlapping chunks for better retrieval.
+    Kept for older imports — chunking lives in app.utils.chunking.
     """
-
-    chunks = []
-    start = 0
-
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-
-    return chunks
+    return chunk_text(text, chunk_size, overlap)
@@ -1,8 +1,34 @@
-from sentence_transformers import SentenceTransformer
+import threading
+from collections import OrderedDict
+
 import numpy as np
 from typing import List
 
+from app.config import (
+    EMBED_WORKERS,
+    EMBEDDING_BACKEND,
+    EMBEDDING_PRELOAD,
+    ONNX_MODEL_DIR,
+    ONNX_QUANTIZE,
+    QUERY_CACHE_MAX_BYTES,
+)
+from app.core.lazy import lazy_import
+from app.rag.embed_pool import embedding_pool
+
+sentence_transformers = lazy_import("sentence_transformers")
+
 _model = None
+_model_lock = threading.Lock()
+
+# intra-op threads for the model; 0 → library default
+_threads = 0
+
+# True inside an embedding pool worker (the only place the model loads
+# when EMBED_WORKERS > 0)
+_pool_worker = False
+
+# not_loaded → loading → ready | failed
+_model_state = "not_loaded"
 
 
 def get_model():
@@ -10,26 +36,118 @@ def get_model():
     Lazy load embedding model ONLY when first used.
     Prevents Railway startup crash.
     """
-    global _model
+    global _model, _model_state
 
     if _model is None:
-        print("Loading embedding model...")
+        with _model_lock:
+            if _model is None:
+                print("Loading embedding model...")
+                _model_state = "loading"
 
-        from sentence_transformers import SentenceTransformer
+                try:
+                    _model = _load_backend()
+                except Exception:
+                    _model_state = "failed"
+                    raise
 
-        _model = SentenceTransformer(
-            "all-MiniLM-L6-v2",
-            device="cpu"
-        )
+                # also clears a "failed" left by an earlier attempt
+                _model_state = "ready"
 
-        print("Embedding model ready.")
+                print("Embedding model ready.")
 
     return _model
 
 
+def configure_worker(threads: int):
+    """
+    Called in an embedding pool worker before the model is loaded:
+    embed locally, with `threads` intra-op threads.
+    """
+    global _threads, _pool_worker
+    _threads = threads
+    _pool_worker = True
+
+
+def _load_backend():
+    if EMBEDDING_BACKEND == "onnx":
+        from app.rag.onnx_backend import OnnxEmbedder, parity_verified, variant
+
+        # vectors must stay interchangeable with existing indexes
+        if not parity_verified(ONNX_MODEL_DIR, ONNX_QUANTIZE):
+            raise RuntimeError(
+                f"EMBEDDING_BACKEND=onnx ({variant(ONNX_QUANTIZE)}) has no passing "
+                f"parity record in {ONNX_MODEL_DIR}; run "
+                f"`python -m scripts.check_onnx_parity` first"
+            )
+
+        return OnnxEmbedder(ONNX_MODEL_DIR, quantize=ONNX_QUANTIZE, threads=_threads)
+
+    if EMBEDDING_BACKEND != "torch":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {EMBEDDING_BACKEND}")
+
+    model = sentence_transformers.SentenceTransformer(
+        "all-MiniLM-L6-v2",
+        device="cpu"
+    )
+
+    if _threads:
+        import torch
+        torch.set_num_threads(_threads)
+
+    return model
+
+
+# =====================================================
+# WARMUP / READINESS
+# =====================================================
+
+def warmup_model():
+    """
+    Loads the model and runs one dummy encode, so the first real
+    request doesn't pay for lazy initialisation. Blocking.
+    """
+    global _model_state
+
+    if _model_state != "ready":
+        _model_state = "loading"
+
+    try:
+        embed_texts(["warmup"])
+    except Exception:
+        _model_state = "failed"
+        raise
+
+    # pool mode: the model was loaded (and warmed) in the workers
+    _model_state = "ready"
+
+
+def model_state() -> str:
+    if _model_state == "not_loaded" and EMBEDDING_PRELOAD == "lazy":
+        return "lazy"
+
+    return _model_state
+
+
+def model_ready() -> bool:
+    """
+    Warm — or lazy mode, where nothing is loaded up front.
+    """
+    return model_state() in ("ready", "lazy")
+
+
 def embed_texts(texts: List[str]) -> np.ndarray:
+
+    # with a worker pool the model lives in the workers only —
+    # never fall back to loading it in the web process
+    if EMBED_WORKERS > 0 and not _pool_worker:
+        return embedding_pool.embed(texts)
+
     model = get_model()
 
+    if EMBEDDING_BACKEND == "onnx":
+        # already normalized float32
+        return model.encode(texts)
+
     embeddings = model.encode(
         texts,
         convert_to_numpy=True,
@@ -38,3 +156,92 @@ def embed_texts(texts: List[str]) -> np.ndarray:
     )
 
     return embeddings.astype("float32")
+
+
+# =====================================================
+# QUERY VECTOR CACHE
+# =====================================================
+
+def normalize_query(message: str) -> str:
+    """
+    Cache key for a validated message.
+    The MiniLM tokenizer is uncased and ignores extra whitespace,
+    so these variants embed identically.
+    """
+    return " ".join(message.split()).lower()
+
+
+class QueryVectorCache:
+    """
+    LRU cache of query embeddings.
+
+    ✔ vectors live in one preallocated float32 matrix
+    ✔ capacity derived from a byte budget
+    ✔ hit ratio reporting
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+
+        self._vectors = None          # (capacity, dim) float32
+        self._slots = OrderedDict()   # key -> row in _vectors
+        self._free = []
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            slot = self._slots.get(key)
+
+            if slot is None:
+                self.misses += 1
+                return None
+
+            self._slots.move_to_end(key)
+            self.hits += 1
+
+            return self._vectors[slot:slot + 1].copy()
+
+    def put(self, key: str, vector: np.ndarray):
+        with self._lock:
+            if self._vectors is None:
+                dim = vector.shape[-1]
+                capacity = self.max_bytes // (dim * 4)
+
+                if capacity == 0:
+                    return
+
+                self._vectors = np.zeros((capacity, dim), dtype="float32")
+                self._free = list(range(capacity - 1, -1, -1))
+
+            slot = self._slots.get(key)
+
+            if slot is None:
+                if not self._free:
+                    _, evicted = self._slots.popitem(last=False)
+                    self._free.append(evicted)
+
+                slot = self._free.pop()
+
+            self._vectors[slot] = vector.reshape(-1)
+            self._slots[key] = slot
+            self._slots.move_to_end(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            row_bytes = self._vectors.shape[1] * 4 if self._vectors is not None else 0
+
+            return {
+                "entries": len(self._slots),
+                "bytes": len(self._slots) * row_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+query_cache = QueryVectorCache(QUERY_CACHE_MAX_BYTES)
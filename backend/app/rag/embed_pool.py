@@ -0,0 +1,335 @@
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.config import (
+    EMBED_PIN_CPUS,
+    EMBED_POOL_MIN_BATCH,
+    EMBED_POOL_TIMEOUT,
+    EMBED_WORKER_THREADS,
+    EMBED_WORKERS,
+)
+from app.core.logger import get_logger
+
+logger = get_logger("embed_pool")
+
+# all-MiniLM-L6-v2 embedding size
+DIMENSION = 384
+
+# no job in progress (worker slot in the shared "current job" array)
+IDLE = -1
+
+
+# =====================================================
+# CPU SLICES (THREAD PINNING)
+# =====================================================
+
+def _available_cpus():
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:      # non-Linux
+        return list(range(os.cpu_count() or 1))
+
+
+def cpu_slices(workers: int):
+    """
+    Disjoint CPU sets, one per worker (shared round-robin when there
+    are more workers than CPUs).
+    """
+
+    cpus = _available_cpus()
+    per = max(1, len(cpus) // workers)
+
+    return [
+        [cpus[(i * per + j) % len(cpus)] for j in range(per)]
+        for i in range(workers)
+    ]
+
+
+# =====================================================
+# WORKER PROCESS
+# =====================================================
+
+def _worker_main(worker_id, cpus, threads, requests, responses, current):
+    """
+    Owns one model copy; embeds batches from the shared request
+    queue and hands each result back in a shared-memory block
+    (the receiver unlinks it).
+    """
+
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    # before torch / onnxruntime create their thread pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    from app.rag import embed
+
+    embed.configure_worker(threads)
+
+    try:
+        embed.warmup_model()
+    except Exception as e:
+        logger.error(f"Embedding worker {worker_id}: model load failed: {e}")
+
+    while True:
+        job = requests.get()
+
+        if job is None:
+            return
+
+        job_id, texts = job
+        current[worker_id] = job_id
+
+        try:
+            vectors = np.ascontiguousarray(embed.embed_texts(texts), dtype="float32")
+
+            shm = shared_memory.SharedMemory(create=True, size=max(vectors.nbytes, 1))
+            view = np.ndarray(vectors.shape, dtype="float32", buffer=shm.buf)
+            view[:] = vectors
+            del view
+
+            responses.put((job_id, shm.name, vectors.shape, None))
+            shm.close()
+
+        except Exception as e:
+            responses.put((job_id, None, None, f"{type(e).__name__}: {e}"))
+
+        current[worker_id] = IDLE
+
+
+# =====================================================
+# POOL (WEB PROCESS SIDE)
+# =====================================================
+
+class EmbeddingPool:
+    """
+    Dedicated embedding processes; the web process never loads
+    the model.
+
+    ✔ configurable process count, each pinned to its own CPUs
+      with a matching intra-op thread count
+    ✔ texts go over a local IPC queue, float32 results come
+      back through shared memory (no pickling of arrays)
+    ✔ large calls are split across workers
+    ✔ a crashed worker fails only its own job and is respawned
+    """
+
+    def __init__(self, workers: int, threads: int, min_batch: int, timeout: float):
+        self.workers = workers
+        self.threads = threads
+        self.min_batch = min_batch
+        self.timeout = timeout
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._procs = []
+        self._slices = []
+        self._requests = None
+        self._responses = None
+        self._current = None
+        self._reader = None
+
+        self._pending = {}          # job_id -> Future
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.jobs = 0
+        self.texts = 0
+        self.restarts = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._procs) and not self._closed
+
+    # ---------- LIFECYCLE ----------
+
+    def start(self):
+        if self.workers <= 0 or self._procs:
+            return
+
+        self._closed = False
+        self._requests = self._ctx.Queue()
+        self._responses = self._ctx.Queue()
+        self._current = self._ctx.Array("q", [IDLE] * self.workers, lock=False)
+        self._slices = cpu_slices(self.workers)
+
+        self._procs = [self._spawn(i) for i in range(self.workers)]
+
+        self._reader = threading.Thread(
+            target=self._read_results,
+            name="embed-pool-results",
+            daemon=True,
+        )
+        self._reader.start()
+
+        logger.info(
+            f"Embedding pool: {self.workers} worker(s), "
+            f"CPUs {self._slices if EMBED_PIN_CPUS else 'unpinned'}"
+        )
+
+    def shutdown(self):
+        if not self._procs:
+            return
+
+        self._closed = True
+
+        for _ in self._procs:
+            self._requests.put(None)
+
+        for proc in self._procs:
+            proc.join(timeout=5)
+
+            if proc.is_alive():
+                proc.terminate()
+
+        self._reader.join(timeout=5)
+        self._procs = []
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for future in pending.values():
+            future.set_exception(RuntimeError("Embedding pool shut down"))
+
+    def _spawn(self, worker_id: int):
+        cpus = self._slices[worker_id]
+
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                worker_id,
+                cpus if EMBED_PIN_CPUS else [],
+                self.threads or len(cpus),
+                self._requests,
+                self._responses,
+                self._current,
+            ),
+            name=f"embed-worker-{worker_id}",
+            daemon=True,
+        )
+        proc.start()
+
+        return proc
+
+    # ---------- EMBED ----------
+
+    def embed(self, texts) -> np.ndarray:
+        """
+        Blocking; safe to call from many threads at once.
+        """
+
+        if not self.running:
+            raise RuntimeError("Embedding pool is not running")
+
+        if not texts:
+            return np.zeros((0, DIMENSION), dtype="float32")
+
+        size = max(self.min_batch, math.ceil(len(texts) / self.workers))
+
+        futures = [
+            self._submit(texts[start:start + size])
+            for start in range(0, len(texts), size)
+        ]
+
+        return np.vstack([f.result(timeout=self.timeout) for f in futures])
+
+    def _submit(self, texts) -> Future:
+        future = Future()
+        job_id = next(self._ids)
+
+        with self._lock:
+            self._pending[job_id] = future
+            self.jobs += 1
+            self.texts += len(texts)
+
+        self._requests.put((job_id, list(texts)))
+
+        return future
+
+    # ---------- RESULTS ----------
+
+    def _read_results(self):
+        while not self._closed:
+            self._check_workers()
+
+            try:
+                job_id, shm_name, shape, error = self._responses.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+
+            vectors = self._take(shm_name, shape) if shm_name else None
+
+            with self._lock:
+                future = self._pending.pop(job_id, None)
+
+            if future is None:
+                continue
+
+            if error:
+                future.set_exception(RuntimeError(f"Embedding worker failed: {error}"))
+            else:
+                future.set_result(vectors)
+
+    @staticmethod
+    def _take(shm_name: str, shape) -> np.ndarray:
+        shm = shared_memory.SharedMemory(name=shm_name)
+
+        try:
+            return np.ndarray(shape, dtype="float32", buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _check_workers(self):
+        for worker_id, proc in enumerate(self._procs):
+            if proc.is_alive() or self._closed:
+                continue
+
+            lost = self._current[worker_id]
+            self._current[worker_id] = IDLE
+
+            logger.warning(
+                f"Embedding worker {worker_id} exited ({proc.exitcode}); respawning"
+            )
+
+            with self._lock:
+                future = self._pending.pop(lost, None)
+
+            if future is not None:
+                future.set_exception(RuntimeError("Embedding worker crashed"))
+
+            self._procs[worker_id] = self._spawn(worker_id)
+            self.restarts += 1
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+
+        return {
+            "workers": len(self._procs),
+            "alive": sum(p.is_alive() for p in self._procs),
+            "pinned_cpus": self._slices if EMBED_PIN_CPUS else None,
+            "jobs": self.jobs,
+            "texts": self.texts,
+            "pending": pending,
+            "restarts": self.restarts,
+        }
+
+
+embedding_pool = EmbeddingPool(
+    EMBED_WORKERS,
+    EMBED_WORKER_THREADS,
+    EMBED_POOL_MIN_BATCH,
+    EMBED_POOL_TIMEOUT,
+)
@@ -1,11 +1,8 @@
-import os
-from groq import Groq
 from dotenv import load_dotenv
 
+from app.core.llm import llm_clients, model_name
+
 load_dotenv()
-print("GROQ:", os.getenv("GROQ_API_KEY")[:10])
-print("GROQ KEY EXISTS:", bool(os.getenv("GROQ_API_KEY")))
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
 
 SYSTEM_PROMPT = """
@@ -31,8 +28,9 @@ def generate_answer(question, contexts):
 
     context_text = "\n\n".join(contexts)
 
-    response = client.chat.completions.create(
-        model=os.getenv("MODEL_NAME", "llama-3.1-8b-instant"),
+    # shared pooled client (sync: callers run this off the event loop)
+    response = llm_clients.get_sync().chat.completions.create(
+        model=model_name(),
         messages=[
             {
                 "role": "system",
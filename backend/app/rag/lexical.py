@@ -0,0 +1,79 @@
+import re
+
+from app.config import LEXICAL_MAX_MATCHES, RRF_K
+from app.rag import store
+
+
+# =====================================================
+# QUERY BUILDING (FTS5 MATCH)
+# =====================================================
+
+# same boundaries as the store's unicode61 tokenizer ('_' kept in tokens)
+_TOKEN_RE = re.compile(r"\w+")
+
+# words that carry no lexical signal on their own
+_STOPWORDS = frozenset("""
+a about an and are as at be but by can do does for from how i if in
+is it me my of on or so that the this to was what when where which who
+why will with you your
+""".split())
+
+
+def query_phrases(message: str):
+    """
+    FTS5 phrases for a user message.
+
+    Each word becomes a quoted phrase of its tokens, so "ERR-4012"
+    matches the adjacent tokens err / 4012. Stopwords and single
+    characters are dropped.
+    """
+
+    phrases = []
+
+    for word in message.split():
+        tokens = _TOKEN_RE.findall(word.lower())
+
+        if not tokens:
+            continue
+
+        if len(tokens) == 1 and (len(tokens[0]) < 2 or tokens[0] in _STOPWORDS):
+            continue
+
+        phrase = '"' + " ".join(tokens) + '"'
+
+        if phrase not in phrases:
+            phrases.append(phrase)
+
+    return phrases
+
+
+def search_lexical(vector_path: str, message: str, limit: int):
+    """
+    Chunk ids ranked by BM25 for the message.
+    """
+
+    phrases = query_phrases(message)
+
+    if not phrases:
+        return []
+
+    return store.search_text(vector_path, phrases, limit, LEXICAL_MAX_MATCHES)
+
+
+# =====================================================
+# RECIPROCAL RANK FUSION
+# =====================================================
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K):
+    """
+    Merges ranked id lists: score(id) = sum 1 / (k + rank).
+    Ties keep first-seen order, so the first ranking wins.
+    """
+
+    scores = {}
+
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+
+    return sorted(scores, key=lambda chunk_id: -scores[chunk_id])
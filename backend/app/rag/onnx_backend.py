@@ -0,0 +1,230 @@
+import json
+import os
+
+import numpy as np
+
+from app.core.lazy import lazy_import
+from app.core.logger import get_logger
+
+ort = lazy_import("onnxruntime")
+
+logger = get_logger("onnx")
+
+HF_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+
+# sentence-transformers' max_seq_length for this model
+MAX_SEQ_LENGTH = 256
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+# written by scripts/check_onnx_parity.py when a model file passes
+PARITY_FILE = "parity.json"
+
+# minimum per-sentence cosine vs sentence-transformers (torch)
+PARITY_MIN_COSINE = {"fp32": 0.99, "int8": 0.95}
+
+# mean per-sentence cosine; int8 rounding error is bounded per weight, so
+# the average stays close even where a single sentence drifts more
+PARITY_MEAN_COSINE = {"fp32": 0.999, "int8": 0.98}
+
+
+# =====================================================
+# EXPORT (ONCE PER MODEL DIR)
+# =====================================================
+
+def export_model(model_dir: str, quantize: bool) -> str:
+    """
+    Exports MiniLM (transformer only — pooling and normalization
+    run in numpy) to ONNX, plus an int8 dynamically quantized copy.
+    Files are written under a temp name and renamed into place,
+    so concurrent workers never load a partial model.
+
+    Needs torch + transformers; serving from an exported dir
+    needs neither.
+    """
+
+    target = os.path.join(model_dir, INT8_FILE if quantize else FP32_FILE)
+
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(model_dir, exist_ok=True)
+    fp32_path = os.path.join(model_dir, FP32_FILE)
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        logger.info(f"Exporting {HF_MODEL_ID} to ONNX in {model_dir}")
+
+        tokenizer = AutoTokenizer.from_pretrained(HF_MODEL_ID)
+        model = AutoModel.from_pretrained(HF_MODEL_ID).eval()
+        model.config.return_dict = False
+
+        sample = tokenizer(["export"], return_tensors="pt")
+        names = ["input_ids", "attention_mask", "token_type_ids"]
+        dynamic = {name: {0: "batch", 1: "sequence"} for name in names}
+        dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        tmp = f"{fp32_path}.{os.getpid()}.tmp"
+
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in names),
+                tmp,
+                input_names=names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic,
+                opset_version=14,
+            )
+
+        tokenizer.save_pretrained(model_dir)
+        os.replace(tmp, fp32_path)
+
+    if quantize and not os.path.exists(target):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"Quantizing {fp32_path} to int8")
+
+        tmp = f"{target}.{os.getpid()}.tmp"
+        quantize_dynamic(fp32_path, tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, target)
+
+    return target
+
+
+# =====================================================
+# PARITY RECORD
+# =====================================================
+
+def variant(quantize: bool) -> str:
+    return "int8" if quantize else "fp32"
+
+
+def _fingerprint(model_path: str):
+    stat = os.stat(model_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def record_parity(model_dir: str, quantize: bool, result: dict):
+    """
+    Stores a passing parity result for the current model file.
+    Re-exporting or re-quantizing changes the fingerprint and
+    invalidates it.
+    """
+
+    path = os.path.join(model_dir, PARITY_FILE)
+    model_path = os.path.join(model_dir, INT8_FILE if quantize else FP32_FILE)
+
+    records = {}
+
+    if os.path.exists(path):
+        with open(path) as f:
+            records = json.load(f)
+
+    records[variant(quantize)] = {
+        **result,
+        "fingerprint": _fingerprint(model_path),
+    }
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp, "w") as f:
+        json.dump(records, f, indent=2)
+
+    os.replace(tmp, path)
+
+
+def parity_verified(model_dir: str, quantize: bool) -> bool:
+    """
+    True when check_onnx_parity passed for exactly this model file.
+    """
+
+    path = os.path.join(model_dir, PARITY_FILE)
+    model_path = os.path.join(model_dir, INT8_FILE if quantize else FP32_FILE)
+
+    if not (os.path.exists(path) and os.path.exists(model_path)):
+        return False
+
+    try:
+        with open(path) as f:
+            record = json.load(f).get(variant(quantize))
+    except (OSError, ValueError):
+        return False
+
+    return bool(
+        record
+        and record.get("passed")
+        and record.get("fingerprint") == _fingerprint(model_path)
+    )
+
+
+# =====================================================
+# INFERENCE
+# =====================================================
+
+class OnnxEmbedder:
+    """
+    all-MiniLM-L6-v2 on ONNX Runtime.
+
+    ✔ same tokenizer, mean pooling and L2 normalization as
+      sentence-transformers, so vectors stay interchangeable
+    ✔ optional int8 dynamic quantization (weights only)
+    ✔ length-sorted batches to keep padding small
+    """
+
+    def __init__(self, model_dir: str, quantize: bool = True, threads: int = 0):
+        from transformers import AutoTokenizer
+
+        model_path = export_model(model_dir, quantize)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.quantized = quantize
+
+    def encode(self, texts, batch_size: int = 32) -> np.ndarray:
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = np.empty((len(texts), 384), dtype="float32")
+
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            out[rows] = self._encode_batch([texts[i] for i in rows])
+
+        return out
+
+    def _encode_batch(self, texts) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=MAX_SEQ_LENGTH,
+            return_tensors="np",
+        )
+
+        feed = {
+            name: tokens[name].astype("int64")
+            for name in self.input_names
+        }
+
+        hidden = self.session.run(None, feed)[0]
+
+        # mean pooling over real tokens, then unit length
+        mask = tokens["attention_mask"][..., None].astype("float32")
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+
+        return (pooled / np.clip(norms, 1e-12, None)).astype("float32")
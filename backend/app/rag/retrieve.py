@@ -1,7 +1,43 @@
-import faiss
+import math
 import numpy as np
 import os
-import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:     # non-POSIX: in-process locking only
+    fcntl = None
+
+from app.config import (
+    ANN_MIN_VECTORS,
+    HYBRID_SEARCH,
+    IVF_NPROBE,
+    INDEX_QUANTIZATION,
+    LEXICAL_CANDIDATES,
+    LEXICAL_MIN_SIMILARITY,
+    PQ_SUBVECTORS,
+    RERANK_CANDIDATES,
+    RETRIEVE_MAX_K,
+    RETRIEVE_MIN_SIMILARITY,
+    RETRIEVE_SCORE_MARGIN,
+    WORKSPACE_MMAP,
+    WORKSPACE_PROMOTE_HITS,
+)
+from app.rag import lexical, store
+from app.rag.answer_cache import answer_cache
+from app.rag.cache import workspace_cache
+from app.core.lazy import lazy_import
+from app.core.logger import get_logger
+
+faiss = lazy_import("faiss")
+
+logger = get_logger("retrieve")
+
+# all-MiniLM-L6-v2 embedding size
+DIMENSION = 384
 
 
 # =====================================================
@@ -12,49 +48,765 @@ def get_index_path(vector_path: str):
     return os.path.join(vector_path, "index.faiss")
 
 
-def get_metadata_path(vector_path: str):
-    return os.path.join(vector_path, "metadata.json")
+def get_lock_path(vector_path: str):
+    return os.path.join(vector_path, ".lock")
 
 
 # =====================================================
 # INDEX LOAD / SAVE
 # =====================================================
 
+def new_index():
+    """
+    Empty ID-addressed index.
+    Vectors are stored under stable chunk ids so a document
+    can be removed without rebuilding the workspace.
+
+    Vectors are L2-normalized, so inner product == cosine similarity.
+    """
+
+    if quantization_for(ivf=False) == "sq8":
+        return faiss.IndexIDMap2(_new_flat_sq8())
+
+    return faiss.IndexIDMap2(faiss.IndexFlatIP(DIMENSION))
+
+
+def _new_flat_sq8():
+    """
+    8-bit codes over the fixed [-1, 1] range of normalized vectors.
+    No data-dependent training, so even a first tiny upload
+    quantizes well.
+    """
+
+    sq = faiss.IndexScalarQuantizer(
+        DIMENSION,
+        faiss.ScalarQuantizer.QT_8bit_uniform,
+        faiss.METRIC_INNER_PRODUCT,
+    )
+    sq.train(np.array([[-1.0] * DIMENSION, [1.0] * DIMENSION], dtype="float32"))
+
+    return sq
+
+
+def new_ivf_index(nlist: int):
+    """
+    Untrained IVF index for large workspaces.
+    IVF keeps chunk ids itself; the hashtable direct map allows
+    reconstruct / remove by id.
+    """
+    quantizer = faiss.IndexFlatIP(DIMENSION)
+    kind = quantization_for(ivf=True)
+
+    if kind == "pq":
+        index = faiss.IndexIVFPQ(
+            quantizer, DIMENSION, nlist, PQ_SUBVECTORS, 8,
+            faiss.METRIC_INNER_PRODUCT,
+        )
+
+    elif kind == "sq8":
+        index = faiss.IndexIVFScalarQuantizer(
+            quantizer, DIMENSION, nlist,
+            faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT,
+        )
+
+    else:
+        index = faiss.IndexIVFFlat(
+            quantizer, DIMENSION, nlist, faiss.METRIC_INNER_PRODUCT
+        )
+
+    index.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+    return index
+
+
+def is_ivf(index) -> bool:
+    return isinstance(index, faiss.IndexIVF)
+
+
+# =====================================================
+# QUANTIZATION
+# =====================================================
+
+QUANTIZATION_MODES = ("none", "sq8", "pq")
+
+
+def quantization_for(ivf: bool) -> str:
+    if INDEX_QUANTIZATION not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown index quantization: {INDEX_QUANTIZATION}")
+
+    # PQ codebooks need thousands of training vectors: IVF tier only
+    if INDEX_QUANTIZATION == "pq" and not ivf:
+        return "sq8"
+
+    return INDEX_QUANTIZATION
+
+
+def storage_kind(index) -> str:
+    """
+    "none" (float32), "sq8" or "pq".
+    """
+
+    inner = index if is_ivf(index) else faiss.downcast_index(index.index)
+
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "pq"
+
+    if isinstance(inner, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "sq8"
+
+    return "none"
+
+
+def code_size(index) -> int:
+    """
+    Bytes stored per vector (excluding its id).
+    """
+
+    if is_ivf(index):
+        return index.code_size
+
+    return faiss.downcast_index(index.index).code_size
+
+
+def needs_migration(index) -> bool:
+    if not (is_ivf(index) or isinstance(index, faiss.IndexIDMap2)):
+        return True
+
+    return index.metric_type != faiss.METRIC_INNER_PRODUCT
+
+
 def load_index(vector_path: str):
+    """
+    Loads index.faiss, migrating older formats in place.
+    Writers only — caller holds workspace_lock (migrations save).
+    Readers use read_index.
+    """
     index_file = get_index_path(vector_path)
 
     if os.path.exists(index_file):
-        return faiss.read_index(index_file)
+        index = faiss.read_index(index_file)
+
+        if is_ivf(index):
+            index.nprobe = IVF_NPROBE
+
+        elif not isinstance(index, faiss.IndexIDMap2):
+            index = migrate_legacy_index(index, vector_path)
+
+        if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+            index = migrate_to_inner_product(index, vector_path)
+
+        return index
 
     # empty fallback index
-    dimension = 384
-    return faiss.IndexFlatL2(dimension)
+    return new_index()
+
+
+def read_index(vector_path: str):
+    """
+    load_index for readers. A workspace that still needs a one-time
+    migration is migrated under workspace_lock from a fresh read of
+    the file, so a stale copy never overwrites a writer's save.
+    """
+    index_file = get_index_path(vector_path)
+
+    if not os.path.exists(index_file):
+        return new_index()
+
+    index = faiss.read_index(index_file)
+
+    if needs_migration(index):
+        with workspace_lock(vector_path):
+            return load_index(vector_path)
+
+    if is_ivf(index):
+        index.nprobe = IVF_NPROBE
+
+    return index
 
 
 def save_index(index, vector_path: str):
+    """
+    Written to a temp file, synced, and renamed over index.faiss:
+    readers (in any process) see the old or the new index, never a
+    partial one, and mapped readers keep a valid (old) inode.
+    """
     os.makedirs(vector_path, exist_ok=True)
-    faiss.write_index(index, get_index_path(vector_path))
+
+    index_file = get_index_path(vector_path)
+    tmp_file = f"{index_file}.{os.getpid()}.tmp"
+
+    faiss.write_index(index, tmp_file)
+
+    fd = os.open(tmp_file, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+    os.replace(tmp_file, index_file)
+
+
+def index_stamp(vector_path: str):
+    """
+    Identity of the current index.faiss. Every save replaces the
+    file, so a changed stamp means another writer (possibly another
+    worker process) saved a new index.
+    """
+    try:
+        st = os.stat(get_index_path(vector_path))
+    except FileNotFoundError:
+        return None
+
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
 
 
 # =====================================================
-# METADATA LOAD / SAVE
+# ONE-TIME MIGRATION (POSITIONAL -> ID MAPPED)
 # =====================================================
 
-def load_metadata(vector_path: str):
-    meta_file = get_metadata_path(vector_path)
+def migrate_legacy_index(index, vector_path: str):
+    """
+    Older workspaces stored a plain IndexFlatL2 whose rows were the
+    *tail* of metadata.json: the old delete wrote an empty index but
+    kept the remaining rows, and later uploads appended to both.
+    Vectors are re-keyed to those tail positions — the chunk store
+    imports legacy rows positionally, so ids line up with it.
+    """
 
-    if not os.path.exists(meta_file):
-        return []
+    # imports metadata.json into a fresh chunk store first
+    count = store.count_chunks(vector_path)
 
-    with open(meta_file, "r") as f:
-        return json.load(f)
+    vectors = index.reconstruct_n(0, index.ntotal)
 
+    if count >= index.ntotal:
+        ids = np.arange(count - index.ntotal, count, dtype="int64")
+    else:
+        # more vectors than rows: nothing to align with; the extra
+        # vectors have no rows and are dropped by the next writer
+        ids = np.arange(index.ntotal, dtype="int64")
 
-def save_metadata(data, vector_path: str):
-    os.makedirs(vector_path, exist_ok=True)
+    migrated = new_index()
+
+    if index.ntotal:
+        migrated.add_with_ids(vectors, ids)
 
-    with open(get_metadata_path(vector_path), "w") as f:
-        json.dump(data, f, indent=2)
+    # head rows: chunks left behind by the old "recreate empty index" delete
+    orphaned = count - index.ntotal
+
+    if orphaned > 0:
+        rows = store.fetch_chunks(vector_path, range(orphaned))
+        documents = sorted({row["document"] for row in rows.values()})
+
+        logger.warning(
+            f"Migrated {vector_path}: chunk id(s) 0-{orphaned - 1} "
+            f"({', '.join(documents)}) have no vectors and will not be "
+            f"searchable until re-uploaded"
+        )
+
+    save_index(migrated, vector_path)
+
+    logger.info(f"Migrated {vector_path} to ID-mapped index ({index.ntotal} vectors)")
+
+    return migrated
+
+
+def migrate_to_inner_product(index, vector_path: str):
+    """
+    L2 indexes returned squared distances as scores. Stored vectors
+    are already normalized, so they are copied as-is into a flat
+    inner-product index; large workspaces are moved back to IVF by
+    the next background rebuild.
+    """
+
+    vectors, ids = export_vectors(index)
+
+    migrated = new_index()
+
+    if len(ids):
+        migrated.add_with_ids(vectors, ids)
+
+    save_index(migrated, vector_path)
+
+    logger.info(f"Migrated {vector_path} to inner-product index ({len(ids)} vectors)")
+
+    return migrated
+
+
+# =====================================================
+# INDEX TIERS (FLAT -> IVF, BACKGROUND REBUILD)
+# =====================================================
+
+# one rebuild at a time per process; training is CPU heavy
+_rebuild_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-rebuild")
+
+_rebuilding = set()
+_rebuilding_guard = threading.Lock()
+
+
+def ivf_nlist(n: int) -> int:
+    # ~4*sqrt(n) lists, with enough points per list to train k-means
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def wants_ivf(index) -> bool:
+    # hysteresis: IVF workspaces stay IVF down to half the threshold
+    if is_ivf(index):
+        return index.ntotal >= ANN_MIN_VECTORS // 2
+
+    return index.ntotal >= ANN_MIN_VECTORS
+
+
+def needs_rebuild(index) -> bool:
+    """
+    ✔ flat workspace reached ANN_MIN_VECTORS → IVF
+    ✔ IVF workspace grown ~4x since training → retrain (nlist doubles)
+    ✔ IVF workspace shrunk below half the threshold → flat
+    ✔ INDEX_QUANTIZATION changed → re-encode
+    """
+
+    ivf = wants_ivf(index)
+
+    if ivf != is_ivf(index):
+        return True
+
+    if storage_kind(index) != quantization_for(ivf):
+        return True
+
+    return ivf and ivf_nlist(index.ntotal) >= 2 * index.nlist
+
+
+def index_ids(index):
+    """
+    Chunk ids stored in the index, for any index tier.
+    """
+
+    if not is_ivf(index):
+        return faiss.vector_to_array(index.id_map)
+
+    invlists = index.invlists
+    parts = []
+
+    for list_no in range(index.nlist):
+        size = invlists.list_size(list_no)
+
+        if size:
+            parts.append(
+                faiss.rev_swig_ptr(invlists.get_ids(list_no), size).copy()
+            )
+
+    return np.concatenate(parts) if parts else np.empty(0, dtype="int64")
+
+
+def export_vectors(index):
+    """
+    (vectors, ids) of every entry, for any index tier.
+    """
+
+    if not is_ivf(index):
+        return index.index.reconstruct_n(0, index.ntotal), index_ids(index)
+
+    ids = index_ids(index)
+
+    if not len(ids):
+        return np.empty((0, DIMENSION), dtype="float32"), ids
+
+    return index.reconstruct_batch(ids), ids
+
+
+def exact_vectors(index, vector_path: str):
+    """
+    export_vectors, with quantized entries replaced by the exact
+    vectors kept in the chunk store where available — rebuilds
+    never compound quantization error.
+    """
+
+    vectors, ids = export_vectors(index)
+
+    if storage_kind(index) == "none" or not len(ids):
+        return vectors, ids
+
+    stored = store.fetch_vectors(vector_path)
+
+    for row, chunk_id in enumerate(ids):
+        vector = stored.get(int(chunk_id))
+
+        if vector is not None:
+            vectors[row] = vector
+
+    return vectors, ids
+
+
+def schedule_rebuild(vector_path: str, index):
+    """
+    Queues a tier change / retrain if the index size calls for one.
+    Searches keep using the current index until the new one is saved.
+    """
+
+    if not needs_rebuild(index):
+        return
+
+    with _rebuilding_guard:
+        if vector_path in _rebuilding:
+            return
+        _rebuilding.add(vector_path)
+
+    _rebuild_pool.submit(_rebuild, vector_path)
+
+
+def _rebuild(vector_path: str):
+    try:
+        # ---------- SNAPSHOT (UNDER LOCK) ----------
+        with workspace_lock(vector_path):
+            index = load_index_for_write(vector_path)
+
+            if not needs_rebuild(index):
+                return
+
+            use_ivf = wants_ivf(index)
+            training, _ = exact_vectors(index, vector_path)
+
+        # ---------- TRAIN (WRITERS NOT BLOCKED) ----------
+        if use_ivf:
+            rebuilt = new_ivf_index(ivf_nlist(len(training)))
+            rebuilt.train(training)
+        else:
+            rebuilt = new_index()
+
+        del training
+
+        # ---------- FILL FROM CURRENT STATE + SWAP ----------
+        with workspace_lock(vector_path):
+            current = load_index_for_write(vector_path)
+
+            # another worker process already rebuilt it
+            if not needs_rebuild(current):
+                return
+
+            vectors, ids = exact_vectors(current, vector_path)
+
+            if len(ids):
+                rebuilt.add_with_ids(vectors, ids)
+
+            save_index(rebuilt, vector_path)
+
+            invalidate_workspace(vector_path)
+
+        logger.info(
+            f"Rebuilt {vector_path} as "
+            f"{f'IVF{rebuilt.nlist}' if use_ivf else 'flat'}"
+            f"/{storage_kind(rebuilt)} ({rebuilt.ntotal} vectors)"
+        )
+
+    except Exception:
+        logger.exception(f"Index rebuild failed: {vector_path}")
+
+    finally:
+        with _rebuilding_guard:
+            _rebuilding.discard(vector_path)
+
+
+# =====================================================
+# CACHED WORKSPACE (READ PATH)
+# =====================================================
+
+def mmap_flags() -> int:
+    # zero-copy: flat codes and IVF lists point straight into the mapping
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+# heap copies of hot workspaces are made off the request path
+_promote_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-promote")
+
+_load_stats = {"mapped": [0, 0.0, 0.0], "heap": [0, 0.0, 0.0]}  # count, total ms, max ms
+_load_stats_guard = threading.Lock()
+_promotions = 0
+
+
+class Workspace:
+    """
+    Read-side view of one workspace, as cached.
+    A mapped index is shared with every worker through the page
+    cache; it is copied onto the heap once it has been queried
+    WORKSPACE_PROMOTE_HITS times.
+    """
+
+    __slots__ = ("index", "mapped", "hits", "stamp")
+
+    def __init__(self, index, mapped: bool, stamp):
+        self.index = index
+        self.mapped = mapped
+        self.hits = 0
+        self.stamp = stamp
+
+
+def map_index(vector_path: str):
+    """
+    Read-only memory-mapped index, or None when there is no file or
+    it still needs a migration (read_index handles those).
+    """
+
+    index_file = get_index_path(vector_path)
+
+    if not os.path.exists(index_file):
+        return None
+
+    index = faiss.read_index(index_file, mmap_flags())
+
+    if needs_migration(index):
+        return None
+
+    if is_ivf(index):
+        index.nprobe = IVF_NPROBE
+
+    return index
+
+
+def _record_load(kind: str, started: float):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    with _load_stats_guard:
+        entry = _load_stats[kind]
+        entry[0] += 1
+        entry[1] += elapsed_ms
+        entry[2] = max(entry[2], elapsed_ms)
+
+
+def _read_workspace(vector_path: str):
+    started = time.perf_counter()
+
+    # taken before reading: a save in between only causes one extra reload
+    stamp = index_stamp(vector_path)
+
+    index = map_index(vector_path) if WORKSPACE_MMAP else None
+    mapped = index is not None
+
+    if not mapped:
+        index = read_index(vector_path)
+
+    _record_load("mapped" if mapped else "heap", started)
+
+    # workspaces that outgrew their tier before this process started
+    schedule_rebuild(vector_path, index)
+
+    # mapped: only the id map is private memory; chunk text stays in the store
+    per_vector = 8 if mapped else code_size(index) + 8
+
+    return Workspace(index, mapped, stamp), index.ntotal * per_vector
+
+
+def _read_heap_workspace(vector_path: str):
+    started = time.perf_counter()
+
+    stamp = index_stamp(vector_path)
+    index = read_index(vector_path)
+
+    _record_load("heap", started)
+
+    return Workspace(index, False, stamp), index.ntotal * (code_size(index) + 8)
+
+
+def _promote(vector_path: str):
+    global _promotions
+
+    try:
+        if workspace_cache.refresh(vector_path, _read_heap_workspace):
+            _promotions += 1
+            logger.info(f"Promoted {vector_path} from mmap to heap")
+
+    except Exception:
+        logger.exception(f"Promotion failed: {vector_path}")
+
+
+def load_workspace(vector_path: str):
+    """
+    Returns the resident index for a workspace.
+    Only readers go through the cache — writers always load from disk.
+
+    Writes made by other worker processes are noticed through the
+    index file stamp (one stat per query); readers never take the
+    writer lock.
+    """
+
+    workspace = workspace_cache.get(vector_path, _read_workspace)
+
+    if workspace.stamp != index_stamp(vector_path):
+        invalidate_workspace(vector_path)
+        workspace = workspace_cache.get(vector_path, _read_workspace)
+
+    if workspace.mapped and WORKSPACE_PROMOTE_HITS:
+        workspace.hits += 1
+
+        if workspace.hits == WORKSPACE_PROMOTE_HITS:
+            _promote_pool.submit(_promote, vector_path)
+
+    return workspace.index
+
+
+def invalidate_workspace(vector_path: str):
+    workspace_cache.invalidate(vector_path)
+
+    # answers were grounded in the old document set
+    answer_cache.invalidate(vector_path)
+
+
+def _process_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def workspace_load_stats():
+    """
+    Cold-load latency and memory, split by mapped vs heap workspaces.
+    """
+
+    workspaces = workspace_cache.values()
+    mapped = [w for w in workspaces if w.mapped]
+
+    with _load_stats_guard:
+        loads = {
+            kind: {
+                "count": count,
+                "avg_ms": round(total / count, 2) if count else 0.0,
+                "max_ms": round(worst, 2),
+            }
+            for kind, (count, total, worst) in _load_stats.items()
+        }
+
+    return {
+        "mapped_workspaces": len(mapped),
+        "heap_workspaces": len(workspaces) - len(mapped),
+        # shared page cache, not private memory
+        "mapped_vector_bytes": sum(
+            w.index.ntotal * code_size(w.index) for w in mapped
+        ),
+        "cold_loads": loads,
+        "promotions": _promotions,
+        "process_rss_bytes": _process_rss_bytes(),
+    }
+
+
+# =====================================================
+# WRITER LOCK (PER WORKSPACE, CROSS-PROCESS)
+# =====================================================
+_writer_locks = {}
+_writer_locks_guard = threading.Lock()
+
+
+def _thread_lock(vector_path: str):
+    with _writer_locks_guard:
+        return _writer_locks.setdefault(vector_path, threading.Lock())
+
+
+@contextmanager
+def workspace_lock(vector_path: str):
+    """
+    Serializes index read-modify-write for one workspace across
+    threads and worker processes (flock on vector_path/.lock).
+    Readers never take it. Not re-entrant.
+    """
+
+    with _thread_lock(vector_path):
+        os.makedirs(vector_path, exist_ok=True)
+
+        with open(get_lock_path(vector_path), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# =====================================================
+# CONSISTENCY CHECK (WRITERS, UNDER LOCK)
+# =====================================================
+
+def load_index_for_write(vector_path: str):
+    """
+    load_index plus an index / chunk store consistency check.
+    Caller holds workspace_lock.
+
+    Chunk rows are always removed before their vectors, so a crash
+    can only leave vectors without rows; those are dropped here.
+    Rows without vectors are left alone — an ingestion may still be
+    writing them.
+
+    Ids stored more than once (left by stores that reused the ids of
+    deleted chunks) are re-indexed from their chunk rows.
+    """
+
+    index = load_index(vector_path)
+
+    ids = index_ids(index)
+    unique_ids, counts = np.unique(ids, return_counts=True)
+
+    duplicated = unique_ids[counts > 1]
+
+    if len(duplicated):
+        _reindex_chunks(index, vector_path, duplicated)
+
+    # full id comparison only when there are more vectors than rows
+    if len(unique_ids) > store.count_chunks(vector_path):
+        orphaned = np.setdiff1d(
+            unique_ids,
+            np.array(store.all_chunk_ids(vector_path), dtype="int64"),
+        )
+
+        if len(orphaned):
+            index.remove_ids(orphaned)
+
+            logger.warning(
+                f"Repaired {vector_path}: removed {len(orphaned)} vector(s) "
+                f"with no chunk rows"
+            )
+    else:
+        orphaned = ()
+
+    if len(duplicated) or len(orphaned):
+        save_index(index, vector_path)
+
+    return index
+
+
+def _reindex_chunks(index, vector_path: str, ids):
+    """
+    Replaces every vector stored under `ids` with one vector per
+    chunk row: the exact stored copy where there is one, a fresh
+    embedding of the row text otherwise.
+    """
+
+    ids = np.asarray(ids, dtype="int64")
+    index.remove_ids(ids)
+
+    vectors = store.fetch_vectors(vector_path, ids)
+    missing = [int(i) for i in ids if int(i) not in vectors]
+
+    if missing:
+        from app.rag.embed import embed_texts
+
+        rows = store.fetch_chunks(vector_path, missing)
+        present = [i for i in missing if i in rows]
+
+        if present:
+            embedded = embed_texts([rows[i]["text"] for i in present])
+            faiss.normalize_L2(embedded)
+            vectors.update(zip(present, embedded))
+
+    if vectors:
+        index.add_with_ids(
+            np.vstack(list(vectors.values())).astype("float32"),
+            np.array(list(vectors), dtype="int64"),
+        )
+
+    logger.warning(
+        f"Repaired {vector_path}: re-indexed {len(ids)} chunk id(s) "
+        f"stored more than once"
+    )
 
 
 # =====================================================
@@ -62,48 +814,448 @@ def save_metadata(data, vector_path: str):
 # =====================================================
 
 def add_embeddings(vectors, metadatas, vector_path: str):
+    add_embedding_batches([(vectors, metadatas)], vector_path)
 
-    index = load_index(vector_path)
-    metadata_store = load_metadata(vector_path)
 
-    faiss.normalize_L2(vectors)
+def add_embedding_batches(batches, vector_path: str):
+    """
+    Adds (vectors, metadatas) batches as they are produced.
+
+    Chunk text goes to the store per batch; only float32 vectors are
+    kept until the end, when the index is updated and saved once under
+    the workspace lock. If a batch fails, rows already written for
+    those documents are removed.
+    """
+
+    doc_ids = set()
+    pending_vectors = []
+    pending_ids = []
+
+    try:
+        for vectors, metadatas in batches:
+
+            faiss.normalize_L2(vectors)
+
+            doc_ids.update(m["doc_id"] for m in metadatas)
+
+            # exact copies only matter when the index is lossy
+            pending_ids.extend(store.add_chunks(
+                vector_path,
+                metadatas,
+                vectors if INDEX_QUANTIZATION != "none" else None,
+            ))
+            pending_vectors.append(vectors.astype("float32"))
+
+    except Exception:
+        for doc_id in doc_ids:
+            store.delete_document(vector_path, doc_id)
+        raise
+
+    if not pending_ids:
+        return 0
+
+    with workspace_lock(vector_path):
+        index = load_index_for_write(vector_path)
+
+        new_ids = np.array(pending_ids, dtype="int64")
+
+        # fresh ids already in the index can only be leftovers of
+        # deleted chunks (stores that predate the id counter)
+        stale = np.intersect1d(index_ids(index), new_ids)
+
+        if len(stale):
+            index.remove_ids(stale)
+            logger.warning(
+                f"{vector_path}: dropped {len(stale)} stale vector(s) "
+                f"under reassigned chunk ids"
+            )
+
+        index.add_with_ids(np.vstack(pending_vectors), new_ids)
+
+        save_index(index, vector_path)
+
+        invalidate_workspace(vector_path)
+
+    schedule_rebuild(vector_path, index)
+
+    return len(pending_ids)
+
+
+# =====================================================
+# VECTOR REUSE (CHUNK DEDUP)
+# =====================================================
+
+def lookup_vectors(vector_path: str, text_hashes):
+    """
+    Returns text_hash -> stored vector for chunks the workspace
+    already indexed, so identical text is never embedded twice.
+    """
+
+    chunk_ids = store.find_chunks_by_hash(vector_path, text_hashes)
+
+    if not chunk_ids:
+        return {}
+
+    # exact copies first (quantized workspaces), index otherwise
+    stored = store.fetch_vectors(vector_path, chunk_ids.values())
+
+    index = load_workspace(vector_path)
+
+    vectors = {}
+
+    for text_hash, chunk_id in chunk_ids.items():
+        if chunk_id in stored:
+            vectors[text_hash] = stored[chunk_id]
+            continue
+
+        try:
+            vectors[text_hash] = index.reconstruct(int(chunk_id))
+        except RuntimeError:
+            # row written by an ingestion that has not saved its index yet
+            continue
+
+    return vectors
+
+
+# =====================================================
+# DELETE EMBEDDINGS
+# =====================================================
+
+def delete_embeddings(doc_id: str, vector_path: str) -> bool:
+    """
+    Removes one document's vectors by chunk id.
+    Other documents stay searchable — nothing is re-embedded.
+
+    Rows go first: a crash before the index save leaves only
+    vectors without rows, which the next writer repairs.
+    """
+
+    with workspace_lock(vector_path):
+
+        # index first: migrates legacy workspaces before ids are read
+        index = load_index_for_write(vector_path)
 
-    index.add(vectors.astype("float32"))
-    metadata_store.extend(metadatas)
+        ids = store.get_chunk_ids(vector_path, doc_id)
 
-    save_index(index, vector_path)
-    save_metadata(metadata_store, vector_path)
+        if not ids:
+            return False
+
+        store.delete_document(vector_path, doc_id)
+
+        index.remove_ids(np.array(ids, dtype="int64"))
+
+        save_index(index, vector_path)
+
+        invalidate_workspace(vector_path)
+
+    schedule_rebuild(vector_path, index)
+
+    return True
 
 
 # =====================================================
 # SEARCH
 # =====================================================
-def search(query_vector, vector_path: str, k=3):
-    index = load_index(vector_path)
-    metadata_store = load_metadata(vector_path)
+def search(
+    query_vector,
+    vector_path: str,
+    k: int = RETRIEVE_MAX_K,
+    min_score: float = RETRIEVE_MIN_SIMILARITY,
+    margin: float = RETRIEVE_SCORE_MARGIN,
+    query_text: str = None,
+):
+    """
+    Top chunks by cosine similarity (score: higher is better).
+
+    ✔ hits below min_score are dropped
+    ✔ adaptive k: hits more than `margin` below the best hit are dropped,
+      so a clear winner is not padded with weak context
+    ✔ quantized indexes: RERANK_CANDIDATES re-scored exactly
+    ✔ with query_text: BM25 hits fused in by reciprocal rank
+      (exact identifiers / codes the embedding misses)
+    """
+
+    return search_batch(
+        query_vector,
+        vector_path,
+        k=k,
+        min_score=min_score,
+        margin=margin,
+        query_texts=[query_text] if query_text else None,
+    )[0]
+
+
+def search_batch(
+    query_vectors,
+    vector_path: str,
+    k: int = RETRIEVE_MAX_K,
+    min_score: float = RETRIEVE_MIN_SIMILARITY,
+    margin: float = RETRIEVE_SCORE_MARGIN,
+    query_texts=None,
+):
+    """
+    search() for an (n, dim) query matrix: one index.search call and
+    one chunk-text fetch for all queries. Returns one result list
+    per query row.
+    """
+
+    index = load_workspace(vector_path)
 
     if index.ntotal == 0:
-        return []
+        return [[] for _ in range(len(query_vectors))]
 
     # cosine similarity
-    faiss.normalize_L2(query_vector)
+    faiss.normalize_L2(query_vectors)
 
-    D, I = index.search(query_vector.astype("float32"), k)
+    rerank = RERANK_CANDIDATES > 0 and storage_kind(index) != "none"
 
-    results = []
+    D, I = index.search(
+        query_vectors.astype("float32"),
+        max(k, RERANK_CANDIDATES) if rerank else k,
+    )
 
-    for score, idx in zip(D[0], I[0]):
+    all_hits = []
 
-        if idx >= len(metadata_store):
-            continue
+    for row in range(len(query_vectors)):
+
+        candidates = [
+            (float(score), int(idx))
+            for score, idx in zip(D[row], I[row])
+            if idx >= 0
+        ]
+
+        if rerank:
+            candidates = rerank_exact(vector_path, query_vectors[row], candidates)
+
+        candidates = candidates[:k]
+
+        hits = []
+
+        if candidates:
+            cutoff = max(min_score, candidates[0][0] - margin)
+
+            hits = [(score, idx) for score, idx in candidates if score >= cutoff]
+
+        if query_texts and HYBRID_SEARCH:
+            hits = fuse_lexical(
+                index,
+                vector_path,
+                query_vectors[row],
+                query_texts[row],
+                hits,
+                k,
+                min_score=min(min_score, LEXICAL_MIN_SIMILARITY),
+            )
+
+        all_hits.append(hits)
+
+    # fetch text for the kept hits only
+    chunks = store.fetch_chunks(
+        vector_path, {idx for hits in all_hits for _, idx in hits}
+    )
+
+    return [
+        [
+            {
+                "document": chunks[idx]["document"],
+                "doc_id": chunks[idx]["doc_id"],
+                "text": chunks[idx]["text"],        #  REQUIRED FOR HIGHLIGHT
+                "page": chunks[idx]["page"],
+                "score": score,
+            }
+            for score, idx in hits
+            if idx in chunks
+        ]
+        for hits in all_hits
+    ]
+
+
+def fuse_lexical(
+    index,
+    vector_path: str,
+    query_vector,
+    query_text: str,
+    hits,
+    k: int,
+    min_score: float = LEXICAL_MIN_SIMILARITY,
+):
+    """
+    Reciprocal rank fusion of vector hits and BM25 hits.
+    Lexical-only hits get their cosine score from the index so
+    scores stay comparable for the confidence heuristic, and are
+    dropped below min_score — a single shared word must not turn
+    an unrelated question into an LLM call.
+    """
+
+    lexical_ids = lexical.search_lexical(vector_path, query_text, LEXICAL_CANDIDATES)
+
+    if not lexical_ids:
+        return hits
+
+    scores = {idx: score for score, idx in hits}
+
+    fused = []
+
+    for idx in lexical.reciprocal_rank_fusion([[idx for _, idx in hits], lexical_ids]):
+
+        if idx not in scores:
+            try:
+                scores[idx] = float(np.dot(index.reconstruct(idx), query_vector))
+            except RuntimeError:
+                # chunk written by an ingestion that has not saved its index yet
+                continue
+
+            if scores[idx] < min_score:
+                continue
+
+        fused.append((scores[idx], idx))
+
+        if len(fused) == k:
+            break
+
+    return fused
+
+
+def rerank_exact(vector_path: str, query_vector, candidates):
+    """
+    Re-scores (score, id) candidates against the exact stored vectors.
+    Chunks without a stored vector keep their approximate score.
+    """
+
+    stored = store.fetch_vectors(vector_path, [idx for _, idx in candidates])
+
+    rescored = [
+        (float(np.dot(stored[idx], query_vector)) if idx in stored else score, idx)
+        for score, idx in candidates
+    ]
+
+    return sorted(rescored, key=lambda c: c[0], reverse=True)
+
+
+# =====================================================
+# INDEX STATS (MEMORY / DISK / RECALL)
+# =====================================================
+
+def index_stats(vector_path: str, recall_sample: int = 0, k: int = RETRIEVE_MAX_K):
+    """
+    Footprint of one workspace's index, for choosing a quantization mode.
+
+    With recall_sample > 0, that many stored vectors are used as
+    queries and recall@k is measured against exact search
+    (before and, for quantized indexes, after re-ranking).
+    """
+
+    index = load_workspace(vector_path)
+
+    stats = {
+        "tier": f"ivf{index.nlist}" if is_ivf(index) else "flat",
+        "quantization": storage_kind(index),
+        "vectors": index.ntotal,
+        "bytes_per_vector": code_size(index),
+        "memory_bytes": index.ntotal * (code_size(index) + 8),
+        "float32_memory_bytes": index.ntotal * (DIMENSION * 4 + 8),
+        "index_file_bytes": _file_size(get_index_path(vector_path)),
+        "store_file_bytes": _file_size(store.get_store_path(vector_path)),
+    }
+
+    if recall_sample > 0 and index.ntotal > k:
+        stats.update(_measure_recall(index, vector_path, recall_sample, k))
+
+    return stats
+
+
+def _file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+# bounds the exact ground-truth scan: sample * ntotal vector comparisons
+_RECALL_MAX_COMPARISONS = 50_000_000
+_RECALL_BLOCK = 8192
+
+
+def _exact_blocks(index, vector_path: str):
+    """
+    (vectors, ids) blocks of the exact vectors, without materializing
+    the whole index.
+    """
+
+    ids = index_ids(index)
+    quantized = storage_kind(index) != "none"
+
+    for start in range(0, len(ids), _RECALL_BLOCK):
+        block_ids = ids[start:start + _RECALL_BLOCK]
+
+        if not is_ivf(index):
+            vectors = index.index.reconstruct_n(start, len(block_ids))
+        else:
+            vectors = index.reconstruct_batch(block_ids)
+
+        if quantized:
+            stored = store.fetch_vectors(vector_path, block_ids)
+
+            for row, chunk_id in enumerate(block_ids):
+                if int(chunk_id) in stored:
+                    vectors[row] = stored[int(chunk_id)]
+
+        yield vectors, block_ids
+
+
+def _exact_vectors_for(index, vector_path: str, ids):
+    stored = store.fetch_vectors(vector_path, ids)
+
+    return np.vstack([
+        stored[int(i)] if int(i) in stored else index.reconstruct(int(i))
+        for i in ids
+    ]).astype("float32")
+
+
+def _measure_recall(index, vector_path: str, sample: int, k: int):
+
+    # CPU bound: large workspaces get a smaller sample
+    sample = min(
+        sample,
+        index.ntotal,
+        max(10, _RECALL_MAX_COMPARISONS // max(index.ntotal, 1)),
+    )
+
+    ids = index_ids(index)
+    query_ids = np.random.default_rng(0).choice(ids, size=sample, replace=False)
+    queries = _exact_vectors_for(index, vector_path, query_ids)
+
+    # ground truth: exact inner product, top k merged block by block
+    heap = faiss.ResultHeap(len(queries), k, keep_max=True)
+
+    for vectors, block_ids in _exact_blocks(index, vector_path):
+        D, I = faiss.knn(
+            queries, vectors, min(k, len(block_ids)),
+            metric=faiss.METRIC_INNER_PRODUCT,
+        )
+        heap.add_result(D, block_ids[I])
+
+    heap.finalize()
+    truth = heap.I
+
+    rerank = RERANK_CANDIDATES > 0 and storage_kind(index) != "none"
+
+    _, found = index.search(queries, max(k, RERANK_CANDIDATES) if rerank else k)
+
+    def recall(found_ids):
+        return round(float(np.mean([
+            len(set(t) & set(f)) / k
+            for t, f in zip(truth, found_ids)
+        ])), 4)
+
+    result = {"recall_sample": len(queries), f"recall_at_{k}": recall(found[:, :k])}
+
+    if rerank:
+        # re-rank the candidate list with the exact vectors
+        reranked = []
 
-        meta = metadata_store[idx]
+        for q, candidates in enumerate(found):
+            candidates = candidates[candidates >= 0]
+            exact = _exact_vectors_for(index, vector_path, candidates) @ queries[q]
+            reranked.append(candidates[np.argsort(-exact)][:k])
 
-        results.append({
-            "document": meta["document"],
-            "doc_id": meta["doc_id"],
-            "text": meta["text"],        #  REQUIRED FOR HIGHLIGHT
-            "score": float(score),
-        })
+        result[f"recall_at_{k}_reranked"] = recall(reranked)
 
-    return results
+    return result
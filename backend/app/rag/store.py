@@ -0,0 +1,520 @@
+import json
+import numpy as np
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from app.core.logger import get_logger
+
+logger = get_logger("chunk_store")
+
+
+# =====================================================
+# PATH HELPERS (PER USER)
+# =====================================================
+
+def get_store_path(vector_path: str):
+    return os.path.join(vector_path, "chunks.db")
+
+
+def get_legacy_metadata_path(vector_path: str):
+    return os.path.join(vector_path, "metadata.json")
+
+
+def store_exists(vector_path: str) -> bool:
+    return (
+        os.path.exists(get_store_path(vector_path))
+        or os.path.exists(get_legacy_metadata_path(vector_path))
+    )
+
+
+# =====================================================
+# CONNECTION + SCHEMA
+# =====================================================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id      TEXT PRIMARY KEY,
+    filename    TEXT NOT NULL,
+    chunks      INTEGER NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL
+);
+
+-- chunk id == FAISS id
+CREATE TABLE IF NOT EXISTS chunks (
+    id            INTEGER PRIMARY KEY,
+    doc_id        TEXT NOT NULL,
+    text          TEXT NOT NULL,
+    page          INTEGER,
+    start_offset  INTEGER,
+    end_offset    INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON chunks(doc_id);
+
+-- per-store counters (next_chunk_id: ids are never handed out twice)
+CREATE TABLE IF NOT EXISTS meta (
+    key    TEXT PRIMARY KEY,
+    value  INTEGER NOT NULL
+);
+"""
+
+
+# stores whose schema this process has already created / upgraded
+_ready = set()
+
+
+@contextmanager
+def connect(vector_path: str):
+    """
+    Opens the workspace chunk store.
+    Commits on success, rolls back on error, always closes.
+    """
+
+    os.makedirs(vector_path, exist_ok=True)
+
+    db_file = get_store_path(vector_path)
+    is_new = not os.path.exists(db_file)
+
+    conn = sqlite3.connect(db_file, timeout=30)
+
+    try:
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        # schema work once per store per process, not per query
+        if is_new or db_file not in _ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            _upgrade_schema(conn)
+
+            if is_new:
+                _import_metadata_json(conn, vector_path)
+
+            _ready.add(db_file)
+
+        yield conn
+        conn.commit()
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        conn.close()
+
+
+# columns added after the first release of chunks.db
+_ADDED_COLUMNS = {
+    "chunks": {
+        "page": "INTEGER",
+        "start_offset": "INTEGER",
+        "end_offset": "INTEGER",
+        "text_hash": "TEXT",
+        "vector": "BLOB",
+    },
+    "documents": {
+        "content_hash": "TEXT",
+    },
+}
+
+_ADDED_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_chunks_text_hash ON chunks(text_hash);
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash);
+"""
+
+
+# BM25 full-text index over chunk text, kept in sync by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    text,
+    content='chunks',
+    content_rowid='id',
+    tokenize="unicode61 tokenchars '_'"
+);
+
+CREATE TRIGGER IF NOT EXISTS chunks_fts_insert AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts(rowid, text) VALUES (new.id, new.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS chunks_fts_delete AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def _upgrade_schema(conn):
+    for table, columns in _ADDED_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+        for column, kind in columns.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+    conn.executescript(_ADDED_INDEXES)
+
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'chunks_fts'"
+    ).fetchone()
+
+    conn.executescript(_FTS_SCHEMA)
+
+    # stores created before full-text search: index existing chunks once
+    if not has_fts:
+        conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('rebuild')")
+        conn.commit()
+
+
+# =====================================================
+# ONE-TIME MIGRATION (metadata.json -> SQLite)
+# =====================================================
+
+def _import_metadata_json(conn, vector_path: str):
+    """
+    Imports a legacy metadata.json into a fresh store.
+    Chunks without an id were stored positionally, which is
+    exactly how legacy FAISS indexes are re-keyed.
+    """
+
+    meta_file = get_legacy_metadata_path(vector_path)
+
+    if not os.path.exists(meta_file):
+        return
+
+    with open(meta_file, "r") as f:
+        metadata = json.load(f)
+
+    now = time.time()
+
+    documents = {}
+    for m in metadata:
+        filename, count = documents.get(m["doc_id"], (m["document"], 0))
+        documents[m["doc_id"]] = (filename, count + 1)
+
+    conn.executemany(
+        "INSERT INTO documents (doc_id, filename, chunks, created_at) "
+        "VALUES (?, ?, ?, ?)",
+        [
+            (doc_id, filename, count, now)
+            for doc_id, (filename, count) in documents.items()
+        ],
+    )
+
+    conn.executemany(
+        "INSERT INTO chunks (id, doc_id, text) VALUES (?, ?, ?)",
+        [
+            (m.get("id", position), m["doc_id"], m["text"])
+            for position, m in enumerate(metadata)
+        ],
+    )
+
+    conn.commit()
+
+    # keep the original around instead of deleting user data
+    os.replace(meta_file, meta_file + ".migrated")
+
+    logger.info(
+        f"Migrated {vector_path}: {len(metadata)} chunk(s), "
+        f"{len(documents)} document(s) moved to SQLite"
+    )
+
+
+# =====================================================
+# WRITES
+# =====================================================
+
+def _allocate_ids(conn, count: int):
+    """
+    Next `count` chunk ids from the store's high-water mark.
+    Ids of deleted chunks are never reused: a crash between the row
+    delete and the index save can leave their vectors behind, and a
+    reused id would resurrect them under another document's text.
+    """
+
+    row = conn.execute(
+        "SELECT value FROM meta WHERE key = 'next_chunk_id'"
+    ).fetchone()
+
+    # stores created before the counter: start above the current rows
+    start = max(
+        row[0] if row else 0,
+        conn.execute("SELECT COALESCE(MAX(id), -1) + 1 FROM chunks").fetchone()[0],
+    )
+
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('next_chunk_id', ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (start + count,),
+    )
+
+    return list(range(start, start + count))
+
+
+def add_chunks(vector_path: str, metadatas, vectors=None):
+    """
+    Appends chunk rows and returns their ids (used as FAISS ids).
+    `vectors` (float32, normalized) are kept only for quantized
+    workspaces, for exact re-ranking and lossless rebuilds.
+    """
+
+    with connect(vector_path) as conn:
+
+        # take the write lock before reading the counter so
+        # concurrent ingestion jobs never hand out the same ids
+        conn.execute("BEGIN IMMEDIATE")
+
+        ids = _allocate_ids(conn, len(metadatas))
+
+        counts = {}
+        for m in metadatas:
+            filename, count = counts.get(m["doc_id"], (m["document"], 0))
+            counts[m["doc_id"]] = (filename, count + 1)
+
+        now = time.time()
+
+        conn.executemany(
+            "INSERT INTO documents (doc_id, filename, chunks, created_at) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(doc_id) DO UPDATE SET chunks = chunks + excluded.chunks",
+            [
+                (doc_id, filename, count, now)
+                for doc_id, (filename, count) in counts.items()
+            ],
+        )
+
+        conn.executemany(
+            "INSERT INTO chunks "
+            "(id, doc_id, text, page, start_offset, end_offset, text_hash, vector) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    chunk_id,
+                    m["doc_id"],
+                    m["text"],
+                    m.get("page"),
+                    m.get("start"),
+                    m.get("end"),
+                    m.get("text_hash"),
+                    vectors[i].tobytes() if vectors is not None else None,
+                )
+                for i, (chunk_id, m) in enumerate(zip(ids, metadatas))
+            ],
+        )
+
+    return ids
+
+
+def set_content_hash(vector_path: str, doc_id: str, content_hash: str):
+    with connect(vector_path) as conn:
+        conn.execute(
+            "UPDATE documents SET content_hash = ? WHERE doc_id = ?",
+            (content_hash, doc_id),
+        )
+
+
+def delete_document(vector_path: str, doc_id: str):
+    with connect(vector_path) as conn:
+        conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+
+# =====================================================
+# READS
+# =====================================================
+
+def list_documents(vector_path: str):
+
+    if not store_exists(vector_path):
+        return []
+
+    with connect(vector_path) as conn:
+        rows = conn.execute(
+            "SELECT doc_id, filename FROM documents ORDER BY created_at"
+        ).fetchall()
+
+    return [
+        {"doc_id": doc_id, "filename": filename}
+        for doc_id, filename in rows
+    ]
+
+
+def count_chunks(vector_path: str) -> int:
+
+    if not store_exists(vector_path):
+        return 0
+
+    with connect(vector_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+
+def find_document_by_hash(vector_path: str, content_hash: str):
+    """
+    Returns {doc_id, filename} of an identical upload, or None.
+    """
+
+    if not store_exists(vector_path):
+        return None
+
+    with connect(vector_path) as conn:
+        row = conn.execute(
+            "SELECT doc_id, filename FROM documents WHERE content_hash = ? LIMIT 1",
+            (content_hash,),
+        ).fetchone()
+
+    if row is None:
+        return None
+
+    return {"doc_id": row[0], "filename": row[1]}
+
+
+def find_chunks_by_hash(vector_path: str, text_hashes):
+    """
+    Returns text_hash -> chunk id for chunks already in the workspace.
+    """
+
+    text_hashes = list(set(text_hashes))
+
+    if not text_hashes or not store_exists(vector_path):
+        return {}
+
+    placeholders = ",".join("?" * len(text_hashes))
+
+    with connect(vector_path) as conn:
+        rows = conn.execute(
+            f"SELECT text_hash, MIN(id) FROM chunks "
+            f"WHERE text_hash IN ({placeholders}) GROUP BY text_hash",
+            text_hashes,
+        ).fetchall()
+
+    return dict(rows)
+
+
+def search_text(vector_path: str, phrases, limit: int, max_matches: int):
+    """
+    Chunk ids matching any FTS5 phrase, best BM25 first.
+
+    Phrases found in more than max_matches chunks are skipped: they
+    do not discriminate, and ranking them is what makes BM25 slow.
+    The bounded probe stops reading after max_matches + 1 rows.
+    """
+
+    if not phrases or not store_exists(vector_path):
+        return []
+
+    with connect(vector_path) as conn:
+        selective = [
+            phrase
+            for phrase in phrases
+            if 0 < count_matches(conn, phrase, max_matches + 1) <= max_matches
+        ]
+
+        if not selective:
+            return []
+
+        rows = conn.execute(
+            "SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ? "
+            "ORDER BY rank LIMIT ?",
+            (" OR ".join(selective), limit),
+        ).fetchall()
+
+    return [r[0] for r in rows]
+
+
+def count_matches(conn, phrase: str, cap: int) -> int:
+    """
+    Chunks matching an FTS5 phrase, counted up to `cap` only.
+    """
+
+    return conn.execute(
+        "SELECT COUNT(*) FROM (SELECT rowid FROM chunks_fts "
+        "WHERE chunks_fts MATCH ? LIMIT ?)",
+        (phrase, cap),
+    ).fetchone()[0]
+
+
+def all_chunk_ids(vector_path: str):
+
+    if not store_exists(vector_path):
+        return []
+
+    with connect(vector_path) as conn:
+        return [r[0] for r in conn.execute("SELECT id FROM chunks")]
+
+
+def get_chunk_ids(vector_path: str, doc_id: str):
+
+    if not store_exists(vector_path):
+        return []
+
+    with connect(vector_path) as conn:
+        rows = conn.execute(
+            "SELECT id FROM chunks WHERE doc_id = ?", (doc_id,)
+        ).fetchall()
+
+    return [r[0] for r in rows]
+
+
+def fetch_chunks(vector_path: str, ids):
+    """
+    Lazy text fetch for search hits only.
+    Returns chunk id -> {document, doc_id, text, page, start, end}.
+    """
+
+    ids = [int(i) for i in ids]
+
+    if not ids:
+        return {}
+
+    placeholders = ",".join("?" * len(ids))
+
+    with connect(vector_path) as conn:
+        rows = conn.execute(
+            "SELECT c.id, c.doc_id, c.text, d.filename, "
+            "c.page, c.start_offset, c.end_offset "
+            "FROM chunks c JOIN documents d ON d.doc_id = c.doc_id "
+            f"WHERE c.id IN ({placeholders})",
+            ids,
+        ).fetchall()
+
+    return {
+        chunk_id: {
+            "document": filename,
+            "doc_id": doc_id,
+            "text": text,
+            "page": page,
+            "start": start,
+            "end": end,
+        }
+        for chunk_id, doc_id, text, filename, page, start, end in rows
+    }
+
+
+def fetch_vectors(vector_path: str, ids=None):
+    """
+    Exact stored vectors, chunk id -> float32 array.
+    All stored vectors when ids is None. Chunks added while
+    quantization was off have none.
+    """
+
+    if not store_exists(vector_path):
+        return {}
+
+    query = "SELECT id, vector FROM chunks WHERE vector IS NOT NULL"
+    params = []
+
+    if ids is not None:
+        ids = [int(i) for i in ids]
+
+        if not ids:
+            return {}
+
+        query += f" AND id IN ({','.join('?' * len(ids))})"
+        params = ids
+
+    with connect(vector_path) as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    return {
+        chunk_id: np.frombuffer(blob, dtype="float32")
+        for chunk_id, blob in rows
+    }
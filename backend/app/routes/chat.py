@@ -1,10 +1,17 @@
-import os
+import json
+import time
+import asyncio
+from typing import List
 from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from groq import Groq
 
-from app.rag.embed import embed_texts
-from app.rag.retrieve import search
+from app.config import BATCH_MAX_QUESTIONS, BATCH_LLM_CONCURRENCY
+from app.core.executor import run_cpu
+from app.core.llm import llm_clients, model_name
+from app.rag.answer_cache import answer_cache
+from app.rag.batcher import embed_query, embed_queries
+from app.rag.retrieve import search, search_batch
 from app.utils.user import get_user_id
 from app.core.logger import get_logger
 from app.core.guardrails import validate_user_message
@@ -19,106 +26,293 @@ router = APIRouter(prefix="/chat", tags=["Chat"])
 # =====================================================
 class ChatRequest(BaseModel):
     message: str
+    stream: bool = False
+
+
+class BatchChatRequest(BaseModel):
+    questions: List[str]
+    generate: bool = False
 
 
 # =====================================================
-# CHAT ENDPOINT
+# RAG PROMPT
 # =====================================================
-@router.post("/")
-async def chat(data: ChatRequest, request: Request):
+SYSTEM_PROMPT = """
+You are a document analysis assistant.
 
-    req_id = getattr(request.state, "request_id", "unknown")
+Rules:
+- Answer ONLY using provided excerpts.
+- Extract facts directly from text.
+- If partially present, infer carefully.
+- Do not hallucinate information.
+- Give concise factual answers.
+"""
 
-    try:
-        logger.info(f"[REQ {req_id}] Chat request received")
+NO_RESULTS_ANSWER = "No relevant documents found."
+NO_RESULTS_CONFIDENCE = 0.2
 
-        # ---------- VALIDATE INPUT ----------
-        message = validate_user_message(data.message)
 
-        # ---------- USER WORKSPACE ----------
-        user_id = get_user_id(request)
-        vector_path = f"storage/vector_db/{user_id}"
+def build_messages(results, message: str):
 
-        # ---------- EMBED QUERY ----------
-        query_vector = embed_texts([message])
+    context_blocks = [
+        f"[Source {i+1}]\n{r['text']}"
+        for i, r in enumerate(results)
+    ]
 
-        # ---------- RETRIEVE DOCUMENT CHUNKS ----------
-        results = search(
-            query_vector,
-            vector_path=vector_path,
-            k=5
-        )
+    context = "\n\n".join(context_blocks)
+
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": f"""
+DOCUMENT EXCERPTS:
+{context}
+
+QUESTION:
+{message}
+
+Answer using the excerpts above.
+"""
+        }
+    ]
+
+
+def confidence_for(results):
+    """
+    Best cosine similarity, nudged up when several chunks agree.
+    """
+    best = max(r["score"] for r in results)
+
+    return round(
+        min(0.95, max(NO_RESULTS_CONFIDENCE, best + 0.05 * (len(results) - 1))),
+        2,
+    )
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+async def retrieve(message: str, vector_path: str, timings: dict):
+    """
+    Returns (query_vector, results); stage latencies go to `timings`.
+    """
+
+    # ---------- EMBED QUERY (MICRO-BATCHED, OFF EVENT LOOP) ----------
+    started = time.perf_counter()
+    query_vector = await embed_query(message)
+    timings["embed"] = _elapsed_ms(started)
+
+    # ---------- RETRIEVE DOCUMENT CHUNKS (VECTOR + BM25, FUSED) ----------
+    started = time.perf_counter()
+    results = await run_cpu(
+        search,
+        query_vector,
+        vector_path=vector_path,
+        query_text=message,
+    )
+    timings["retrieve"] = _elapsed_ms(started)
+
+    return query_vector, results
+
+
+def source_doc_ids(results):
+    return {r["doc_id"] for r in results}
+
+
+async def answer_for(
+    message: str,
+    vector_path: str,
+    query_vector,
+    results,
+    req_id: str,
+    timings: dict = None,
+):
+    """
+    Answer grounded in `results`: semantic cache first, LLM otherwise.
+    """
+
+    if not results:
+        logger.info(f"[REQ {req_id}] No documents matched")
+        return NO_RESULTS_ANSWER
+
+    # ---------- SEMANTIC ANSWER CACHE ----------
+    doc_ids = source_doc_ids(results)
+
+    cached = answer_cache.lookup(vector_path, query_vector, doc_ids)
+
+    if cached is not None:
+        logger.info(f"[REQ {req_id}] Answer cache hit")
+        return cached
+
+    client = llm_clients.get_async()
+
+    logger.info(f"[REQ {req_id}] Calling LLM")
+
+    # =====================================================
+    # LLM CALL (RAG PROMPT)
+    # =====================================================
+    started = time.perf_counter()
+
+    completion = await client.chat.completions.create(
+        model=model_name(),
+        temperature=0.2,
+        messages=build_messages(results, message),
+    )
+
+    if timings is not None:
+        timings["llm"] = _elapsed_ms(started)
+
+    answer = (completion.choices[0].message.content or "").strip()
+
+    # never cache an empty answer — near-duplicates would replay it
+    if answer:
+        answer_cache.put(vector_path, query_vector, doc_ids, answer)
+
+    return answer
+
+
+# =====================================================
+# SSE STREAM
+# =====================================================
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_answer(message: str, vector_path: str, req_id: str):
+    """
+    Server-Sent Events:
+    sources → token* → done (confidence)
+    Errors after the stream has started are sent as an `error` event.
+    """
+
+    timings = {}
+
+    try:
+        query_vector, results = await retrieve(message, vector_path, timings)
+
+        yield sse_event("sources", results)
 
         if not results:
             logger.info(f"[REQ {req_id}] No documents matched")
 
-            return {
-                "success": True,
-                "answer": "No relevant documents found.",
-                "sources": [],
-                "confidence": 0.2
-            }
-
-        # ---------- BUILD CONTEXT ----------
-        context_blocks = [
-            f"[Source {i+1}]\n{r['text']}"
-            for i, r in enumerate(results)
-        ]
+            yield sse_event("token", {"text": NO_RESULTS_ANSWER})
+            yield sse_event("done", {"confidence": NO_RESULTS_CONFIDENCE})
+            return
 
-        context = "\n\n".join(context_blocks)
+        # ---------- SEMANTIC ANSWER CACHE ----------
+        cached = answer_cache.lookup(
+            vector_path, query_vector, source_doc_ids(results)
+        )
+
+        if cached is not None:
+            logger.info(f"[REQ {req_id}] Answer cache hit")
 
-        # ---------- ENV VARIABLES ----------
-        GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-        MODEL_NAME = os.getenv("MODEL_NAME", "llama-3.1-8b-instant")
+            yield sse_event("token", {"text": cached})
+            yield sse_event("done", {"confidence": confidence_for(results)})
+            return
 
-        if not GROQ_API_KEY:
-            raise RuntimeError("GROQ_API_KEY missing")
+        client = llm_clients.get_async()
 
-        client = Groq(api_key=GROQ_API_KEY)
+        logger.info(f"[REQ {req_id}] Streaming LLM")
 
-        logger.info(f"[REQ {req_id}] Calling LLM")
+        started = time.perf_counter()
 
-        # =====================================================
-        # LLM CALL (RAG PROMPT)
-        # =====================================================
-        completion = client.chat.completions.create(
-            model=MODEL_NAME,
+        stream = await client.chat.completions.create(
+            model=model_name(),
             temperature=0.2,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-You are a document analysis assistant.
+            messages=build_messages(results, message),
+            stream=True,
+        )
 
-Rules:
-- Answer ONLY using provided excerpts.
-- Extract facts directly from text.
-- If partially present, infer carefully.
-- Do not hallucinate information.
-- Give concise factual answers.
-"""
+        tokens = []
+        finish_reason = None
+
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            token = chunk.choices[0].delta.content
+
+            if token:
+                if not tokens:
+                    timings["llm_first_token"] = _elapsed_ms(started)
+
+                tokens.append(token)
+                yield sse_event("token", {"text": token})
+
+        timings["llm"] = _elapsed_ms(started)
+
+        answer = "".join(tokens).strip()
+
+        # same rule as answer_for: only complete, non-empty answers;
+        # a stream that stopped without a finish_reason is not complete
+        if answer and finish_reason is not None:
+            answer_cache.put(
+                vector_path,
+                query_vector,
+                source_doc_ids(results),
+                answer,
+            )
+        elif not answer:
+            logger.warning(f"[REQ {req_id}] LLM stream returned no tokens")
+
+        yield sse_event("done", {"confidence": confidence_for(results)})
+
+        logger.info(f"[REQ {req_id}] Chat stream completed successfully {timings}")
+
+    except Exception:
+        logger.exception(f"[REQ {req_id}] Chat stream failed")
+
+        yield sse_event("error", {"message": "Internal AI processing error"})
+
+
+# =====================================================
+# CHAT ENDPOINT
+# =====================================================
+@router.post("/")
+async def chat(data: ChatRequest, request: Request):
+
+    req_id = getattr(request.state, "request_id", "unknown")
+
+    try:
+        logger.info(f"[REQ {req_id}] Chat request received")
+
+        # ---------- VALIDATE INPUT ----------
+        message = validate_user_message(data.message)
+
+        # ---------- USER WORKSPACE ----------
+        user_id = get_user_id(request)
+        vector_path = f"storage/vector_db/{user_id}"
+
+        # ---------- STREAMING MODE ----------
+        if data.stream:
+            return StreamingResponse(
+                stream_answer(message, vector_path, req_id),
+                media_type="text/event-stream",
+                headers={
+                    "Cache-Control": "no-cache",
+                    "X-Accel-Buffering": "no",   # disable proxy buffering
                 },
-                {
-                    "role": "user",
-                    "content": f"""
-DOCUMENT EXCERPTS:
-{context}
+            )
 
-QUESTION:
-{message}
+        timings = {}
 
-Answer using the excerpts above.
-"""
-                }
-            ],
-        )
+        query_vector, results = await retrieve(message, vector_path, timings)
 
-        answer = completion.choices[0].message.content.strip()
+        answer = await answer_for(
+            message, vector_path, query_vector, results, req_id, timings
+        )
 
         # ---------- CONFIDENCE HEURISTIC ----------
-        confidence = min(0.9, 0.4 + (len(results) * 0.1))
+        confidence = confidence_for(results) if results else NO_RESULTS_CONFIDENCE
 
-        logger.info(f"[REQ {req_id}] Chat completed successfully")
+        logger.info(f"[REQ {req_id}] Chat completed successfully {timings}")
 
         return {
             "success": True,
@@ -135,3 +329,93 @@ Answer using the excerpts above.
             status_code=500,
             detail="Internal AI processing error"
         )
+
+
+# =====================================================
+# BATCH ENDPOINT (EVALUATION SETS)
+# =====================================================
+@router.post("/batch")
+async def chat_batch(data: BatchChatRequest, request: Request):
+    """
+    Top-k sources for many questions against one workspace.
+
+    ✔ one embedding call for every uncached question
+    ✔ one index.search over the whole query matrix
+    ✔ generate=true: answers fanned out to the LLM,
+      BATCH_LLM_CONCURRENCY at a time; failures are per question
+    """
+
+    req_id = getattr(request.state, "request_id", "unknown")
+
+    if not data.questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+
+    if len(data.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {BATCH_MAX_QUESTIONS} questions per batch"
+        )
+
+    messages = [validate_user_message(q) for q in data.questions]
+
+    try:
+        logger.info(f"[REQ {req_id}] Batch of {len(messages)} questions received")
+
+        # ---------- USER WORKSPACE ----------
+        user_id = get_user_id(request)
+        vector_path = f"storage/vector_db/{user_id}"
+
+        # ---------- EMBED + RETRIEVE (ONE CALL EACH) ----------
+        query_vectors = await embed_queries(messages)
+
+        all_results = await run_cpu(
+            search_batch,
+            query_vectors,
+            vector_path=vector_path,
+            query_texts=messages,
+        )
+
+        items = [
+            {"question": message, "sources": results}
+            for message, results in zip(messages, all_results)
+        ]
+
+        # ---------- OPTIONAL GENERATION (BOUNDED FAN-OUT) ----------
+        if data.generate:
+            semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+            async def generate(row: int):
+                item = items[row]
+                results = item["sources"]
+
+                async with semaphore:
+                    try:
+                        item["answer"] = await answer_for(
+                            item["question"],
+                            vector_path,
+                            query_vectors[row:row + 1],
+                            results,
+                            req_id,
+                        )
+                        item["confidence"] = (
+                            confidence_for(results) if results
+                            else NO_RESULTS_CONFIDENCE
+                        )
+
+                    except Exception:
+                        logger.exception(f"[REQ {req_id}] Batch question {row} failed")
+                        item["error"] = "Internal AI processing error"
+
+            await asyncio.gather(*(generate(row) for row in range(len(items))))
+
+        logger.info(f"[REQ {req_id}] Batch completed successfully")
+
+        return {"success": True, "results": items}
+
+    except Exception:
+        logger.exception(f"[REQ {req_id}] Batch endpoint failed")
+
+        raise HTTPException(
+            status_code=500,
+            detail="Internal AI processing error"
+        )
@@ -1,6 +1,7 @@
 import os
 from fastapi import APIRouter, Request, HTTPException
 from app.documents.manager import list_documents, delete_document
+from app.rag.retrieve import index_stats
 from app.utils.user import get_user_id
 from app.core.logger import get_logger
 
@@ -21,6 +22,22 @@ def get_documents(request: Request):
     return {"documents": docs}
 
 
+@router.get("/index/stats")
+def get_index_stats(request: Request, recall_sample: int = 0):
+    """
+    Index memory / disk footprint; recall@k when recall_sample > 0.
+    """
+
+    if not 0 <= recall_sample <= 500:
+        raise HTTPException(status_code=400, detail="recall_sample must be 0-500")
+
+    user_id = get_user_id(request)
+
+    vector_path = f"storage/vector_db/{user_id}"
+
+    return index_stats(vector_path, recall_sample=recall_sample)
+
+
 @router.delete("/{doc_id}")
 def remove_document(doc_id: str, request: Request):
 
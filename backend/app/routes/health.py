@@ -1,70 +1,62 @@
 from fastapi import APIRouter
-import os
-import faiss
+from fastapi.responses import JSONResponse
 
-from groq import Groq
+from app.core.health import health_prober
+from app.core.llm import llm_clients
+from app.rag.answer_cache import answer_cache
+from app.rag.batcher import query_batcher
+from app.rag.cache import workspace_cache
+from app.rag.embed import model_ready, model_state, query_cache
+from app.rag.embed_pool import embedding_pool
+from app.rag.retrieve import workspace_load_stats
 
 router = APIRouter(prefix="/status", tags=["Status"])
 
 
-@router.get("/")
-def system_status():
-
-    # -------------------
-    # Backend health
-    # -------------------
-    backend_status = "ok"
-
-    # -------------------
-    # Vector DB health
-    # -------------------
-    try:
-        index_path = "storage/vector_db/index.faiss"
+# -------------------
+# Liveness (process up, no dependency checks)
+# -------------------
+@router.get("/live")
+def liveness():
+    return {"status": "alive"}
 
-        if os.path.exists(index_path):
-            faiss.read_index(index_path)
 
-        database_status = "ok"
+# -------------------
+# Readiness (embedding model loaded and warmed)
+# -------------------
+@router.get("/ready")
+def readiness():
+    ready = model_ready()
 
-    except Exception as e:
-        print("DB HEALTH ERROR:", e)
-        database_status = "unavailable"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting",
+            "embedding_model": model_state(),
+        },
+    )
 
-    # -------------------
-    # LLM REAL HEALTH CHECK
-    # -------------------
-    llm_status = "unavailable"
-
-    try:
-        GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-        MODEL_NAME = os.getenv("MODEL_NAME", "llama-3.1-8b-instant")
-
-        if GROQ_API_KEY:
 
-            client = Groq(api_key=GROQ_API_KEY)
-
-            # VERY SMALL TEST REQUEST
-            completion = client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=[
-                    {"role": "user", "content": "ping"}
-                ],
-                max_tokens=2,
-                temperature=0,
-            )
-
-            if completion:
-                llm_status = "ok"
+@router.get("/")
+def system_status():
 
-    except Exception as e:
-        print("LLM HEALTH ERROR:", e)
-        llm_status = "unavailable"
+    # cached — refreshed by the background prober
+    checks = health_prober.snapshot()
 
     # -------------------
     # FINAL STATUS
     # -------------------
     return {
-        "backend": backend_status,
-        "database": database_status,
-        "llm": llm_status
+        "backend": "ok",
+        "database": checks["database"]["status"],
+        "llm": checks["llm"]["status"],
+        "ready": model_ready(),
+        "checks": checks,
+        "workspace_cache": workspace_cache.stats(),
+        "workspace_loads": workspace_load_stats(),
+        "embedding_batcher": query_batcher.stats(),
+        "query_cache": query_cache.stats(),
+        "embedding_pool": embedding_pool.stats(),
+        "answer_cache": answer_cache.stats(),
+        "llm_client": llm_clients.stats(),
     }
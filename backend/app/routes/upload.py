@@ -1,7 +1,14 @@
 import os
 from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from typing import List
-from app.documents.manager import save_document
+from app.documents.jobs import ingest_queue
+from app.config import MAX_FILE_SIZE
+from app.documents.manager import (
+    store_upload,
+    find_duplicate,
+    FileTooLargeError,
+)
 from app.utils.user import get_user_id
 from app.core.logger import get_logger
 
@@ -16,8 +23,9 @@ router = APIRouter(prefix="/upload", tags=["Upload"])
 # Allowed file extensions
 ALLOWED_EXTENSIONS = (".pdf", ".docx", ".xlsx", ".txt", ".md")
 
-# ⭐ Prevent Render OOM (very important)
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB per file
+# ⭐ Per-file size limit: MAX_FILE_SIZE_MB in app.config (default 5MB).
+# Uploads are streamed to disk and ingested in batches, so raising it
+# does not raise peak memory proportionally.
 
 # Optional upload limit (prevents abuse)
 MAX_FILES_PER_REQUEST = 5
@@ -37,7 +45,7 @@ async def upload_documents(
     ✔ Each user gets isolated storage
     ✔ Memory-safe file handling
     ✔ File validation + limits
-    ✔ Render free-tier optimized
+    ✔ Ingestion runs in background jobs (poll /upload/jobs/{id})
     """
 
     # ---------- BASIC VALIDATION ----------
@@ -64,6 +72,7 @@ async def upload_documents(
 
     uploaded = []
     rejected = []
+    duplicates = 0
 
     # ---------- PROCESS FILES ----------
     for file in files:
@@ -81,27 +90,58 @@ async def upload_documents(
                 rejected.append(filename)
                 continue
 
-            # ---------- SIZE CHECK (memory-safe) ----------
-            content = await file.read()
+            # ---------- SAVE (size checked while streaming) ----------
+            try:
+                saved = await store_upload(
+                    upload_file=file,
+                    documents_path=user_doc_dir,
+                    max_bytes=MAX_FILE_SIZE,
+                )
 
-            if len(content) > MAX_FILE_SIZE:
+            except FileTooLargeError:
                 print(f"Rejected (too large): {filename}")
                 rejected.append(filename)
                 continue
 
-            # rewind pointer for streaming save later
-            file.file.seek(0)
-
-            # ---------- SAVE + INGEST ----------
-            saved = await save_document(
-                upload_file=file,
-                documents_path=user_doc_dir,
-                vector_path=user_vector_dir,
+            # ---------- CONTENT DEDUP: ALREADY INDEXED ----------
+            # (first open of an older chunk store builds its FTS index —
+            # off the event loop)
+            existing = await run_in_threadpool(
+                find_duplicate, user_vector_dir, saved["content_hash"]
             )
 
+            # ---------- QUEUE INGESTION (OR JOIN AN IN-FLIGHT JOB) ----------
+            if existing is None:
+                job = await run_in_threadpool(
+                    ingest_queue.submit,
+                    user_id=user_id,
+                    doc_id=saved["id"],
+                    filename=saved["name"],
+                    filepath=saved["path"],
+                    vector_path=user_vector_dir,
+                    content_hash=saved["content_hash"],
+                )
+
+                if job["duplicate"]:
+                    existing = job
+
+            if existing:
+                os.remove(saved["path"])
+                duplicates += 1
+
+                uploaded.append({
+                    "doc_id": existing["doc_id"],
+                    "filename": saved["name"],
+                    "job_id": existing.get("job_id"),
+                    "duplicate": True,
+                })
+                continue
+
             uploaded.append({
-                "doc_id": saved["id"],
+                "doc_id": job["doc_id"],
                 "filename": saved["name"],
+                "job_id": job["job_id"],
+                "duplicate": False,
             })
 
 
@@ -117,7 +157,29 @@ async def upload_documents(
         )
 
     return {
-        "message": f"{len(uploaded)} file(s) uploaded successfully",
+        "message": f"{len(uploaded)} file(s) uploaded, processing started",
         "uploaded": uploaded,
-        "rejected_files": rejected
+        "rejected_files": rejected,
+        "duplicates": duplicates,
     }
+
+
+# ---------------------------------------
+# INGESTION JOB STATUS
+# ---------------------------------------
+@router.get("/jobs/{job_id}")
+def get_upload_job(job_id: str, request: Request):
+    """
+    Poll ingestion progress.
+    status: queued | running | done | failed
+    """
+
+    job = ingest_queue.get(job_id)
+
+    # jobs are only visible inside their own workspace
+    if job is None or job["user_id"] != get_user_id(request):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    job.pop("user_id")
+
+    return job
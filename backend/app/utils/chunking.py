@@ -1,13 +1,386 @@
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 100):
-    chunks = []
+import re
+from collections import deque
+
+from app.config import CHUNKER, CHUNK_MAX_CHARS, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+
+
+# =====================================================
+# TOKENS (APPROXIMATE)
+# =====================================================
+
+# CJK ideographs / kana: MiniLM's tokenizer reads one piece per character
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+
+# words + punctuation — close to MiniLM word-piece counts for prose
+_TOKEN_RE = re.compile(rf"[{_CJK}]|[^\W{_CJK}]+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+# =====================================================
+# PAGE TRACKING
+# =====================================================
+
+class _PageTracker:
+    """
+    Maps document offsets back to the page they came from.
+    Offsets must be queried in non-decreasing order.
+    """
+
+    def __init__(self):
+        self._marks = deque()   # (offset, page)
+
+    def mark(self, offset: int, page):
+        self._marks.append((offset, page))
+
+    def page_at(self, offset: int):
+        while len(self._marks) > 1 and self._marks[1][0] <= offset:
+            self._marks.popleft()
+
+        return self._marks[0][1] if self._marks else None
+
+
+def _chunk(text: str, start: int, end: int, pages: _PageTracker):
+    return {
+        "text": text,
+        "start": start,
+        "end": end,
+        "page": pages.page_at(start),
+    }
+
+
+# =====================================================
+# FIXED CHUNKER (CHAR WINDOW)
+# =====================================================
+
+def fixed_chunks(segments, chunk_size: int = 500, overlap: int = 100):
+    """
+    Sliding character window over (page, text) segments.
+    Only the unconsumed tail is buffered, never the whole document.
+    """
+
+    step = chunk_size - overlap
+    pages = _PageTracker()
+
+    buffer = ""
+    base = 0         # document offset of buffer[0]
+    start = 0        # window start inside buffer
+    emitted = 0      # buffer offset up to which text was already yielded
+
+    for page, segment in segments:
+        if not segment:
+            continue
+
+        pages.mark(base + len(buffer), page)
+
+        # drop consumed text once per segment (linear overall)
+        buffer = buffer[start:] + segment
+        base += start
+        emitted = max(0, emitted - start)
+        start = 0
+
+        while len(buffer) - start >= chunk_size:
+            yield _chunk(
+                buffer[start:start + chunk_size],
+                base + start,
+                base + start + chunk_size,
+                pages,
+            )
+            emitted = start + chunk_size
+            start += step
+
+    if len(buffer) > emitted:
+        yield _chunk(buffer[start:], base + start, base + len(buffer), pages)
+
+
+# =====================================================
+# STRUCTURED CHUNKER (SENTENCE / PARAGRAPH / HEADING)
+# =====================================================
+
+_PARAGRAPH_BREAK_RE = re.compile(r"\n[ \t\r]*\n")
+_LINE_RE = re.compile(r"[^\n]+")
+
+# shortest span ending in . ! ? (plus closing quotes) before whitespace
+_SENTENCE_RE = re.compile(r"\S.*?(?:[.!?][\"'”’)\]]*(?=\s)|$)", re.S)
+
+_MD_HEADING_RE = re.compile(r"#{1,6}\s+\S")
+_NUMBERED_HEADING_RE = re.compile(r"\d+(\.\d+)+\.?\s+[A-Z]")
+
+# paragraphs longer than this are cut at a line break
+_MAX_PARAGRAPH_CHARS = 16 * 1024
+
+
+def _is_heading(line: str) -> bool:
+    line = line.strip()
+
+    if not line or len(line) > 80:
+        return False
+
+    if _MD_HEADING_RE.match(line):
+        return True
+
+    if line[-1] in ".!?,;:" or len(line.split()) > 10:
+        return False
+
+    if _NUMBERED_HEADING_RE.match(line):
+        return True
+
+    # ALL CAPS short line
+    letters = sum(1 for c in line if c.isalpha())
+    return letters >= 3 and line.upper() == line
+
+
+def _paragraph_units(paragraph: str, offset: int):
+    """
+    Yields (text, start, end, is_heading) for one paragraph.
+    Lines are re-joined with spaces, so sentence offsets
+    still index the original text.
+    """
+
+    run_start = run_end = None
+
+    def sentences():
+        run = paragraph[run_start:run_end].replace("\n", " ").replace("\r", " ")
+
+        for m in _SENTENCE_RE.finditer(run):
+            text = " ".join(m.group().split())
+
+            if text:
+                yield (
+                    text,
+                    offset + run_start + m.start(),
+                    offset + run_start + m.start() + len(m.group().rstrip()),
+                    False,
+                )
+
+    for line in _LINE_RE.finditer(paragraph):
+
+        if _is_heading(line.group()):
+            if run_start is not None:
+                yield from sentences()
+                run_start = None
+
+            yield (
+                " ".join(line.group().split()),
+                offset + line.start(),
+                offset + line.end(),
+                True,
+            )
+            continue
+
+        if run_start is None:
+            run_start = line.start()
+
+        run_end = line.end()
+
+    if run_start is not None:
+        yield from sentences()
 
-    start = 0
-    text_length = len(text)
 
-    while start < text_length:
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start += chunk_size - overlap
+class _Packer:
+    """
+    Packs sentence / heading units into chunks under a token limit.
 
-    return chunks
+    ✔ a heading always starts a new chunk
+    ✔ trailing sentences carry over as overlap (never across a heading)
+    ✔ sentences over the token or character limit are split into windows
+    ✔ no chunk is longer than max_chars
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        overlap_tokens: int,
+        pages: _PageTracker,
+        max_chars: int = CHUNK_MAX_CHARS,
+    ):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.max_chars = max_chars
+        self.pages = pages
+
+        self.units = []     # (text, start, end, tokens, sep, is_heading)
+        self.tokens = 0
+        self.chars = 0
+
+    def add(self, text, start, end, sep, is_heading):
+        tokens = count_tokens(text)
+
+        if tokens > self.max_tokens or len(text) > self.max_chars:
+            yield from self.flush()
+            yield from self._split_long(text, start)
+            return
+
+        if is_heading:
+            yield from self.flush()
+
+        elif self.units and (
+            self.tokens + tokens > self.max_tokens
+            or self.chars + len(sep) + len(text) > self.max_chars
+        ):
+            yield from self.flush(carry=True)
+
+            # carried overlap + this unit would still break the char cap
+            if self.chars + len(sep) + len(text) > self.max_chars:
+                self.units = []
+                self.tokens = self.chars = 0
+
+        if not self.units:
+            sep = ""
+
+        self.units.append((text, start, end, tokens, sep, is_heading))
+        self.tokens += tokens
+        self.chars += len(sep) + len(text)
+
+    def flush(self, carry: bool = False):
+        if not self.units:
+            return
+
+        first = self.units[0]
+        text = first[0] + "".join(u[4] + u[0] for u in self.units[1:])
+
+        yield _chunk(text, first[1], self.units[-1][2], self.pages)
+
+        kept = []
+        kept_tokens = 0
+
+        if carry:
+            for unit in reversed(self.units[1:]):
+                if unit[5] or kept_tokens + unit[3] > self.overlap_tokens:
+                    break
+                kept.insert(0, unit)
+                kept_tokens += unit[3]
+
+        self.units = kept
+        self.tokens = kept_tokens
+        self.chars = sum(len(u[4]) + len(u[0]) for u in kept[1:])
+        self.chars += len(kept[0][0]) if kept else 0
+
+    def _split_long(self, text, start):
+        """
+        Token windows (with overlap) that also stay under max_chars;
+        a single "token" longer than max_chars (no whitespace at all)
+        is cut into fixed character windows first.
+        """
+
+        spans = []
+
+        for s, e in (m.span() for m in _TOKEN_RE.finditer(text)):
+            while e - s > self.max_chars:
+                spans.append((s, s + self.max_chars))
+                s += self.max_chars
+
+            spans.append((s, e))
+
+        i = 0
+
+        while i < len(spans):
+            j = i + 1
+
+            while (
+                j < len(spans)
+                and j - i < self.max_tokens
+                and spans[j][1] - spans[i][0] <= self.max_chars
+            ):
+                j += 1
+
+            yield _chunk(
+                text[spans[i][0]:spans[j - 1][1]],
+                start + spans[i][0],
+                start + spans[j - 1][1],
+                self.pages,
+            )
+
+            if j >= len(spans):
+                break
+
+            i = max(i + 1, j - self.overlap_tokens)
+
+
+def structured_chunks(
+    segments,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+):
+    """
+    Sentence / paragraph / heading aware chunks over (page, text)
+    segments, in a single linear pass. Only the current paragraph
+    is buffered.
+    """
+
+    pages = _PageTracker()
+    packer = _Packer(max_tokens, overlap_tokens, pages)
+
+    buffer = ""
+    base = 0        # document offset of buffer[0]
+
+    def paragraph(text, offset):
+        sep = "\n\n"
+
+        for unit_text, start, end, is_heading in _paragraph_units(text, offset):
+            yield from packer.add(unit_text, start, end, sep, is_heading)
+            sep = "\n" if is_heading else " "
+
+    for page, segment in segments:
+        if not segment:
+            continue
+
+        pages.mark(base + len(buffer), page)
+
+        scan_from = max(0, len(buffer) - 8)
+        buffer += segment
+
+        # ---------- COMPLETE PARAGRAPHS ----------
+        cut = 0
+
+        for m in _PARAGRAPH_BREAK_RE.finditer(buffer, scan_from):
+            yield from paragraph(buffer[cut:m.start()], base + cut)
+            cut = m.end()
+
+        # ---------- RUNAWAY PARAGRAPH (NO BLANK LINES) ----------
+        if len(buffer) - cut > _MAX_PARAGRAPH_CHARS:
+            line_break = buffer.rfind("\n", cut)
+
+            if line_break <= cut:
+                line_break = buffer.rfind(" ", cut)
+
+            if line_break > cut:
+                yield from paragraph(buffer[cut:line_break], base + cut)
+                cut = line_break + 1
+
+        buffer = buffer[cut:]
+        base += cut
+
+    yield from paragraph(buffer, base)
+    yield from packer.flush()
+
+
+# =====================================================
+# ENGINE
+# =====================================================
+
+CHUNKERS = {
+    "fixed": fixed_chunks,
+    "structured": structured_chunks,
+}
+
+
+def chunk_segments(segments, strategy: str = CHUNKER):
+    """
+    Chunks (page, text) segments with the configured strategy.
+    Yields {"text", "start", "end", "page"}.
+    """
+
+    if strategy not in CHUNKERS:
+        raise ValueError(f"Unknown chunker: {strategy}")
+
+    return CHUNKERS[strategy](segments)
+
+
+def chunk_text(text: str, chunk_size: int = 500, overlap: int = 100):
+    return [
+        c["text"]
+        for c in fixed_chunks([(None, text)], chunk_size, overlap)
+    ]
@@ -0,0 +1,153 @@
+"""
+ANN tier benchmark: recall@k and single-query latency of the IVF tier
+against exact (flat) search, on synthetic clustered embeddings.
+
+Run from backend/:
+
+    python -m scripts.bench_ann
+    python -m scripts.bench_ann --vectors 200000 --nprobe 4,16,64
+    IVF_NPROBE=32 INDEX_QUANTIZATION=sq8 python -m scripts.bench_ann
+
+Indexes are built with the same constructors the app uses
+(new_index / new_ivf_index / ivf_nlist), so INDEX_QUANTIZATION and
+PQ_SUBVECTORS apply. --nprobe defaults to IVF_NPROBE.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.config import IVF_NPROBE
+from app.rag.retrieve import (
+    DIMENSION,
+    faiss,
+    ivf_nlist,
+    new_index,
+    new_ivf_index,
+    storage_kind,
+)
+
+
+# =====================================================
+# SYNTHETIC DATA
+# =====================================================
+
+def clustered_vectors(n: int, clusters: int, spread: float, rng) -> np.ndarray:
+    """
+    Unit vectors around `clusters` random topics — closer to real
+    chunk embeddings than uniform noise, where IVF looks unrealistically bad.
+    """
+
+    centers = rng.standard_normal((clusters, DIMENSION)).astype("float32")
+    faiss.normalize_L2(centers)
+
+    labels = rng.integers(0, clusters, size=n)
+
+    noise = rng.standard_normal((n, DIMENSION)) * (spread / np.sqrt(DIMENSION))
+    vectors = (centers[labels] + noise).astype("float32")
+
+    faiss.normalize_L2(vectors)
+
+    return vectors
+
+
+# =====================================================
+# MEASUREMENT
+# =====================================================
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(
+        len(np.intersect1d(found[row], truth[row])) for row in range(len(truth))
+    )
+    return hits / (len(truth) * k)
+
+
+def single_query_latency(index, queries: np.ndarray, k: int):
+    """
+    One query per search() call, like the chat path.
+    Returns (ids, p50 ms, p95 ms).
+    """
+
+    found = np.empty((len(queries), k), dtype="int64")
+    timings = []
+
+    for row in range(len(queries)):
+        started = time.perf_counter()
+        _, ids = index.search(queries[row:row + 1], k)
+        timings.append((time.perf_counter() - started) * 1000)
+        found[row] = ids[0]
+
+    return found, float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+
+def report(name: str, recall: float, p50: float, p95: float):
+    print(f"{name:<28} recall@k={recall:.3f}  p50={p50:8.3f} ms  p95={p95:8.3f} ms")
+
+
+# =====================================================
+# MAIN
+# =====================================================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--spread", type=float, default=1.5)
+    parser.add_argument(
+        "--nprobe",
+        default=str(IVF_NPROBE),
+        help="comma-separated nprobe values (default: IVF_NPROBE)",
+    )
+    parser.add_argument("--threads", type=int, default=1,
+                        help="FAISS OpenMP threads (1 = per-request serving)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    rng = np.random.default_rng(args.seed)
+
+    print(f"Generating {args.vectors} vectors ({args.clusters} clusters)...")
+    vectors = clustered_vectors(args.vectors, args.clusters, args.spread, rng)
+    ids = np.arange(args.vectors, dtype="int64")
+
+    # queries: perturbed corpus points, so each has real near neighbours
+    picks = rng.choice(args.vectors, size=args.queries, replace=False)
+    noise = rng.standard_normal((args.queries, DIMENSION)) * (0.3 / np.sqrt(DIMENSION))
+    queries = (vectors[picks] + noise).astype("float32")
+    faiss.normalize_L2(queries)
+
+    # ---------- GROUND TRUTH (EXACT FLOAT32) ----------
+    exact = faiss.IndexFlatIP(DIMENSION)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    # ---------- FLAT TIER (AS SERVED) ----------
+    flat = new_index()
+    flat.add_with_ids(vectors, ids)
+
+    found, p50, p95 = single_query_latency(flat, queries, args.k)
+    report(f"flat/{storage_kind(flat)}", recall_at_k(found, truth), p50, p95)
+    del flat
+
+    # ---------- IVF TIER ----------
+    nlist = ivf_nlist(args.vectors)
+    ivf = new_ivf_index(nlist)
+
+    started = time.perf_counter()
+    ivf.train(vectors)
+    ivf.add_with_ids(vectors, ids)
+    print(f"IVF{nlist}/{storage_kind(ivf)} built in {time.perf_counter() - started:.1f} s")
+
+    for nprobe in (int(v) for v in args.nprobe.split(",") if v.strip()):
+        ivf.nprobe = nprobe
+
+        found, p50, p95 = single_query_latency(ivf, queries, args.k)
+        report(f"IVF{nlist} nprobe={nprobe}", recall_at_k(found, truth), p50, p95)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Chat LLM-call concurrency benchmark against a local fake completions
+server: the pooled AsyncGroq client vs the old per-request client.
+
+Run from backend/:
+
+    python -m scripts.bench_chat_concurrency
+    python -m scripts.bench_chat_concurrency --latency-ms 500 --concurrency 1,16,64
+    LLM_MAX_CONNECTIONS=50 python -m scripts.bench_chat_concurrency
+
+The fake server answers every /chat/completions POST after --latency-ms,
+over HTTP/1.1 keep-alive, and counts the TCP connections it accepts.
+GROQ_BASE_URL is pointed at it, so the real SDK + httpx stack is measured.
+
+Clients, each driven from one event loop (one uvicorn worker):
+  per-request  Groq(api_key=...) built per call and called synchronously
+               inside the coroutine — what chat() did before
+  pooled       llm_clients-style AsyncGroq on one shared connection
+               pool (LLMClientManager), awaited
+
+For each in-flight level: throughput, p50/p95 latency per call and
+connections opened.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+# =====================================================
+# FAKE COMPLETIONS SERVER
+# =====================================================
+
+COMPLETION = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench",
+    "choices": [{
+        "index": 0,
+        "message": {"role": "assistant", "content": "Benchmark answer."},
+        "finish_reason": "stop",
+    }],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13},
+}
+
+
+class FakeCompletions(BaseHTTPRequestHandler):
+    """
+    One instance per TCP connection; keep-alive serves many requests.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    # headers and body go out in separate writes; without this,
+    # Nagle + delayed ACK adds ~40 ms to every response
+    disable_nagle_algorithm = True
+
+    latency = 0.2
+    connections = 0
+    _count_lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+
+        with FakeCompletions._count_lock:
+            FakeCompletions.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        time.sleep(self.latency)
+
+        body = json.dumps(COMPLETION).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(latency: float) -> ThreadingHTTPServer:
+    FakeCompletions.latency = latency
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCompletions)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+# =====================================================
+# CLIENTS
+# =====================================================
+
+MESSAGES = [{"role": "user", "content": "What is the refund policy?"}]
+
+
+def per_request_client():
+    """
+    Pre-pool chat(): a new sync client per request, called
+    directly on the event loop.
+    """
+    from groq import Groq
+
+    async def call():
+        client = Groq(api_key=os.environ["GROQ_API_KEY"])
+        try:
+            client.chat.completions.create(model="bench", messages=MESSAGES)
+        finally:
+            client.close()
+
+    async def close():
+        pass
+
+    return call, close
+
+
+def pooled_client():
+    from app.core.llm import LLMClientManager
+
+    manager = LLMClientManager()
+
+    async def call():
+        await manager.get_async().chat.completions.create(
+            model="bench", messages=MESSAGES
+        )
+
+    return call, manager.aclose
+
+
+CLIENTS = {
+    "per-request": per_request_client,
+    "pooled": pooled_client,
+}
+
+
+# =====================================================
+# MEASUREMENT
+# =====================================================
+
+async def run_level(make_client, in_flight: int, total: int):
+    """
+    `in_flight` closed-loop users share `total` calls. A call
+    arrives when its user's previous call finished, so latency
+    includes time spent waiting on a blocked event loop.
+    Returns (seconds, per-call latencies in ms).
+    """
+
+    call, close = make_client()
+    remaining = [total]
+    latencies = []
+
+    async def user():
+        arrived = time.perf_counter()
+
+        while remaining[0] > 0:
+            remaining[0] -= 1
+
+            await call()
+
+            finished = time.perf_counter()
+            latencies.append((finished - arrived) * 1000)
+            arrived = finished
+
+            # let other users run between calls
+            await asyncio.sleep(0)
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(in_flight)))
+        return time.perf_counter() - started, latencies
+    finally:
+        await close()
+
+
+# =====================================================
+# MAIN
+# =====================================================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--concurrency", default="1,8,32",
+                        help="comma-separated in-flight request levels")
+    parser.add_argument("--requests", type=int, default=0,
+                        help="calls per level (default: 4 x in-flight, min 8)")
+    parser.add_argument("--clients", default=",".join(CLIENTS),
+                        help="comma-separated: per-request, pooled")
+    args = parser.parse_args()
+
+    server = start_server(args.latency_ms / 1000)
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+
+    print(
+        f"Fake server {os.environ['GROQ_BASE_URL']} "
+        f"latency={args.latency_ms:.0f} ms"
+    )
+    print(
+        f"{'client':<12} {'in-flight':>9} {'calls':>6} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'connections':>12}"
+    )
+
+    try:
+        for in_flight in (int(v) for v in args.concurrency.split(",") if v.strip()):
+            total = args.requests or max(8, 4 * in_flight)
+
+            for name in args.clients.split(","):
+                FakeCompletions.connections = 0
+
+                seconds, latencies = asyncio.run(
+                    run_level(CLIENTS[name], in_flight, total)
+                )
+
+                print(
+                    f"{name:<12} {in_flight:9d} {total:6d} {total / seconds:8.1f} "
+                    f"{np.percentile(latencies, 50):8.0f} "
+                    f"{np.percentile(latencies, 95):8.0f} "
+                    f"{FakeCompletions.connections:12d}"
+                )
+
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Chunker benchmark: throughput (chunks/sec, MB/s) and retrieval hit-rate
+of the fixed and structured chunkers on a synthetic sectioned corpus.
+
+Run from backend/:
+
+    python -m scripts.bench_chunking
+    python -m scripts.bench_chunking --docs 200 --k 5
+    python -m scripts.bench_chunking --embedder hashing     # no model needed
+
+Every section of the corpus holds one "fact" sentence with a unique key
+("The retention period for unit QX-417 is 38 days."). Each fact gets one
+question; a query is a hit when one of its top-k chunks contains the
+whole fact sentence, so chunks that cut a fact in half count as misses.
+
+--embedder model (default) embeds with app.rag.embed.embed_texts, i.e.
+the configured EMBEDDING_BACKEND. --embedder hashing is a lexical
+stand-in (TF-IDF over hashed words) for machines without the model; its
+absolute hit-rates are not comparable to the model's.
+"""
+
+import argparse
+import re
+import time
+import zlib
+
+import numpy as np
+
+from app.rag.retrieve import DIMENSION, faiss
+from app.utils.chunking import CHUNKERS, count_tokens
+
+
+# =====================================================
+# SYNTHETIC CORPUS
+# =====================================================
+
+WORDS = (
+    "account invoice refund policy shipping customer order payment "
+    "contract service vendor report audit budget schedule compliance "
+    "release support ticket region manager quarter review storage "
+    "backup network access license renewal warehouse delivery"
+).split()
+
+ATTRIBUTES = (
+    "retention period", "approval limit", "review cycle",
+    "escalation window", "storage quota", "renewal term",
+)
+
+UNITS = ("days", "hours", "weeks", "GB", "EUR")
+
+
+def filler_sentence(rng) -> str:
+    words = rng.choice(WORDS, size=int(rng.integers(8, 22)))
+    return " ".join(words).capitalize() + "."
+
+
+def make_document(doc: int, sections: int, rng):
+    """
+    Returns ((page, text) segments, [(fact, question), ...]).
+    One page per section; headings, paragraphs and the fact position
+    vary so chunk boundaries land in different places.
+    """
+
+    segments = []
+    facts = []
+
+    for section in range(sections):
+        key = f"{chr(65 + doc % 26)}{chr(65 + section % 26)}-{doc * 100 + section}"
+        attribute = ATTRIBUTES[int(rng.integers(len(ATTRIBUTES)))]
+        value = f"{int(rng.integers(2, 999))} {UNITS[int(rng.integers(len(UNITS)))]}"
+
+        fact = f"The {attribute} for unit {key} is {value}."
+        facts.append((fact, f"What is the {attribute} for unit {key}?"))
+
+        paragraphs = [
+            [filler_sentence(rng) for _ in range(int(rng.integers(3, 9)))]
+            for _ in range(int(rng.integers(2, 6)))
+        ]
+
+        # drop the fact into a random paragraph, at a random sentence
+        where = paragraphs[int(rng.integers(len(paragraphs)))]
+        where.insert(int(rng.integers(len(where) + 1)), fact)
+
+        body = "\n\n".join(" ".join(sentences) for sentences in paragraphs)
+        heading = f"## {section + 1}. {attribute.title()} rules"
+
+        segments.append((section + 1, f"{heading}\n\n{body}\n\n"))
+
+    return segments, facts
+
+
+# =====================================================
+# EMBEDDERS
+# =====================================================
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _hashed_counts(texts) -> np.ndarray:
+    # crc32, not hash(): deterministic across runs
+    out = np.zeros((len(texts), DIMENSION), dtype="float32")
+
+    for row, text in enumerate(texts):
+        for word in _WORD_RE.findall(text.lower()):
+            out[row, zlib.crc32(word.encode()) % DIMENSION] += 1.0
+
+    return out
+
+
+def hashing_embedder(chunks):
+    """
+    TF-IDF over hashed words, with IDF fitted on the chunks.
+    Returns an embed(texts) function.
+    """
+
+    df = (_hashed_counts(chunks) > 0).sum(axis=0)
+    idf = np.log((1 + len(chunks)) / (1 + df)).astype("float32") + 1.0
+
+    def embed(texts) -> np.ndarray:
+        out = _hashed_counts(texts) * idf
+        faiss.normalize_L2(out)
+        return out
+
+    return embed
+
+
+def model_embedder(chunks):
+    from app.rag.embed import embed_texts
+
+    def embed(texts, batch: int = 256) -> np.ndarray:
+        return np.vstack([
+            embed_texts(texts[start:start + batch])
+            for start in range(0, len(texts), batch)
+        ])
+
+    return embed
+
+
+EMBEDDERS = {
+    "model": model_embedder,
+    "hashing": hashing_embedder,
+}
+
+
+# =====================================================
+# MEASUREMENT
+# =====================================================
+
+def throughput(strategy: str, documents, repeat: int):
+    """
+    Best-of-`repeat` wall time over the whole corpus.
+    Returns (chunks, seconds).
+    """
+
+    best = None
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = [
+            chunk["text"]
+            for segments in documents
+            for chunk in CHUNKERS[strategy](segments)
+        ]
+        elapsed = time.perf_counter() - started
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return chunks, best
+
+
+_FACT_RE = re.compile(r"The [a-z ]+ for unit [A-Z]{2}-\d+ is \d+ \w+\.")
+
+
+def hit_rate(chunks, facts, embedder, k: int):
+    """
+    (hit-rate@k, fraction of facts not contained whole in any chunk)
+    """
+
+    embed = EMBEDDERS[embedder](chunks)
+
+    index = faiss.IndexFlatIP(DIMENSION)
+    index.add(embed(chunks))
+
+    _, top = index.search(embed([question for _, question in facts]), k)
+
+    hits = sum(
+        any(fact in chunks[i] for i in row if i >= 0)
+        for (fact, _), row in zip(facts, top)
+    )
+
+    whole = {fact for chunk in chunks for fact in _FACT_RE.findall(chunk)}
+
+    split = sum(fact not in whole for fact, _ in facts)
+
+    return hits / len(facts), split / len(facts)
+
+
+# =====================================================
+# MAIN
+# =====================================================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--embedder", choices=sorted(EMBEDDERS), default="model")
+    parser.add_argument(
+        "--strategies",
+        default=",".join(CHUNKERS),
+        help="comma-separated chunkers (default: all)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    documents = []
+    facts = []
+
+    for doc in range(args.docs):
+        segments, doc_facts = make_document(doc, args.sections, rng)
+        documents.append(segments)
+        facts.extend(doc_facts)
+
+    size = sum(len(text) for segments in documents for _, text in segments)
+    print(f"Corpus: {args.docs} docs, {size / 1e6:.1f} MB, {len(facts)} facts")
+
+    for strategy in args.strategies.split(","):
+        chunks, seconds = throughput(strategy, documents, args.repeat)
+        rate, split = hit_rate(chunks, facts, args.embedder, args.k)
+        avg_tokens = sum(count_tokens(c) for c in chunks) / len(chunks)
+
+        print(
+            f"{strategy:<11} {len(chunks):7d} chunks  "
+            f"{len(chunks) / seconds:9.0f} chunks/s  {size / seconds / 1e6:6.1f} MB/s  "
+            f"~{avg_tokens:.0f} tok/chunk  "
+            f"hit@{args.k}={rate:.3f} ({args.embedder})  split facts={split:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Hybrid retrieval benchmark: search() latency with HYBRID_SEARCH on vs
+off at several workspace sizes, plus the cost of the LEXICAL_MAX_MATCHES
+probe that keeps common words out of the BM25 query.
+
+Run from backend/:
+
+    python -m scripts.bench_hybrid
+    python -m scripts.bench_hybrid --sizes 10000,100000 --repeat 200
+    LEXICAL_MAX_MATCHES=500 python -m scripts.bench_hybrid
+
+Each size gets a temp workspace built through add_embeddings (chunk
+store, FTS index and the FAISS tier the app would pick; a background
+IVF rebuild is waited for). Chunk text draws from a Zipf-like
+vocabulary, so some query words match most chunks, and a few chunks
+carry unique error codes. Query embedding is not timed — it is the
+same in both modes.
+
+Per size:
+  search()   p50 / p95 ms per query, hybrid off vs on, and the overhead
+  probe      the bounded COUNT probe per query phrase (the part
+             LEXICAL_MAX_MATCHES adds) and how many phrases it drops
+  bm25       store.search_text at LEXICAL_MAX_MATCHES vs unbounded
+             (every phrase kept), which is what the probe saves
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from app.config import LEXICAL_CANDIDATES, LEXICAL_MAX_MATCHES
+from app.rag import lexical, retrieve, store
+from app.rag.retrieve import DIMENSION, faiss
+
+
+# =====================================================
+# SYNTHETIC WORKSPACE
+# =====================================================
+
+VOCABULARY = (
+    "customer order refund policy payment invoice shipping account "
+    "contract service vendor report audit budget schedule compliance "
+    "release support ticket region manager quarter review storage backup "
+    "network access license renewal warehouse delivery escalation token "
+    "session gateway timeout retry webhook ledger settlement dispute"
+).split()
+
+QUERIES = (
+    "what is the refund policy for customer orders",
+    "what does ERR-4017 mean",
+    "how do i fix ERR-4012 on the payment gateway",
+    "webhook retry timeout for settlement disputes",
+    "who approves the quarter budget review",
+)
+
+
+def chunk_texts(count: int, rng):
+    # Zipf-like: the first words land in most chunks
+    weights = 1.0 / np.arange(1, len(VOCABULARY) + 1)
+    weights /= weights.sum()
+
+    texts = []
+
+    for i in range(count):
+        words = rng.choice(VOCABULARY, size=60, p=weights)
+        text = " ".join(words)
+
+        if i % 997 == 0:
+            text += f" Error ERR-{4000 + i % 50} occurs when the token expires."
+
+        texts.append(text)
+
+    return texts
+
+
+def build_workspace(path: str, count: int, rng):
+    vectors = rng.standard_normal((count, DIMENSION)).astype("float32")
+    faiss.normalize_L2(vectors)
+
+    metadatas = [
+        {"doc_id": f"d{i % 20}", "document": f"d{i % 20}.txt", "text": text,
+         "page": None, "start": 0, "end": len(text)}
+        for i, text in enumerate(chunk_texts(count, rng))
+    ]
+
+    retrieve.add_embeddings(vectors, metadatas, path)
+
+    # single-thread rebuild pool: a no-op queued behind the rebuild
+    retrieve._rebuild_pool.submit(lambda: None).result()
+    retrieve.invalidate_workspace(path)
+
+
+# =====================================================
+# MEASUREMENT
+# =====================================================
+
+def timed_ms(fn, repeat: int):
+    timings = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+
+def search_latency(path: str, query_vectors, hybrid: bool, repeat: int):
+    retrieve.HYBRID_SEARCH = hybrid
+
+    def run():
+        for text, vector in zip(QUERIES, query_vectors):
+            retrieve.search(vector[None, :].copy(), path, query_text=text)
+
+    run()   # warm the workspace cache
+
+    p50, p95 = timed_ms(run, repeat)
+
+    return p50 / len(QUERIES), p95 / len(QUERIES)
+
+
+def probe_cost(path: str, repeat: int):
+    """
+    (ms per query for the COUNT probes, phrases dropped, phrases total)
+    """
+
+    phrases = [lexical.query_phrases(q) for q in QUERIES]
+
+    with store.connect(path) as conn:
+        dropped = sum(
+            store.count_matches(conn, phrase, LEXICAL_MAX_MATCHES + 1) > LEXICAL_MAX_MATCHES
+            for query in phrases
+            for phrase in query
+        )
+
+        def run():
+            for query in phrases:
+                for phrase in query:
+                    store.count_matches(conn, phrase, LEXICAL_MAX_MATCHES + 1)
+
+        p50, _ = timed_ms(run, repeat)
+
+    return p50 / len(QUERIES), dropped, sum(len(q) for q in phrases)
+
+
+def bm25_latency(path: str, max_matches: int, repeat: int):
+    phrases = [lexical.query_phrases(q) for q in QUERIES]
+
+    def run():
+        for query in phrases:
+            store.search_text(path, query, LEXICAL_CANDIDATES, max_matches)
+
+    p50, _ = timed_ms(run, repeat)
+
+    return p50 / len(QUERIES)
+
+
+# =====================================================
+# MAIN
+# =====================================================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,50000",
+                        help="comma-separated workspace sizes (chunks)")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    query_vectors = rng.standard_normal((len(QUERIES), DIMENSION)).astype("float32")
+    faiss.normalize_L2(query_vectors)
+
+    print(f"LEXICAL_MAX_MATCHES={LEXICAL_MAX_MATCHES} LEXICAL_CANDIDATES={LEXICAL_CANDIDATES}")
+    print(
+        f"{'chunks':>7} {'tier':>10} | {'off p50':>8} {'on p50':>8} {'on p95':>8} "
+        f"{'overhead':>9} | {'probe':>7} {'dropped':>8} | {'bm25':>7} {'unbounded':>9}"
+    )
+
+    for size in (int(v) for v in args.sizes.split(",") if v.strip()):
+        path = tempfile.mkdtemp(prefix="bench_hybrid_")
+
+        try:
+            build_workspace(path, size, rng)
+
+            index = retrieve.load_workspace(path)
+            tier = f"{'ivf' if retrieve.is_ivf(index) else 'flat'}/{retrieve.storage_kind(index)}"
+
+            off_p50, _ = search_latency(path, query_vectors, False, args.repeat)
+            on_p50, on_p95 = search_latency(path, query_vectors, True, args.repeat)
+
+            probe, dropped, total = probe_cost(path, args.repeat)
+            bounded = bm25_latency(path, LEXICAL_MAX_MATCHES, args.repeat)
+            unbounded = bm25_latency(path, size, args.repeat)
+
+            print(
+                f"{size:7d} {tier:>10} | {off_p50:8.2f} {on_p50:8.2f} {on_p95:8.2f} "
+                f"{on_p50 - off_p50:+9.2f} | {probe:7.2f} {f'{dropped}/{total}':>8} | "
+                f"{bounded:7.2f} {unbounded:9.2f}"
+            )
+
+        finally:
+            retrieve.invalidate_workspace(path)
+            shutil.rmtree(path, ignore_errors=True)
+
+    print("(ms per query; probe and bm25 columns are part of the hybrid overhead)")
+
+
+if __name__ == "__main__":
+    main()
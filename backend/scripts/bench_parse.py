@@ -0,0 +1,178 @@
+"""
+Parse benchmark: serial vs process-pool parsing wall time on a
+synthetic PDF corpus.
+
+Run from backend/:
+
+    python -m scripts.bench_parse
+    python -m scripts.bench_parse --files 8 --pages 200
+    PARSE_PROCESSES=8 PDF_PAGES_PER_TASK=10 python -m scripts.bench_parse
+
+Modes, each timed over the whole corpus:
+  serial      parse_file() per file in this process (the pre-pool path)
+  pool        iter_file() per file, one file at a time — page ranges
+              fan out over PARSE_PROCESSES workers
+  pool+jobs   iter_file() from INGEST_WORKERS threads at once, like
+              concurrent ingestion jobs
+
+Pool startup (spawn + imports) is measured once and reported separately.
+Every mode's text is checked against serial, file by file.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.config import (
+    INGEST_WORKERS,
+    PARSE_PROCESSES,
+    PDF_PAGES_PER_TASK,
+    PDF_TASKS_IN_FLIGHT,
+)
+from app.core.executor import get_process_pool, shutdown_process_pool
+from app.documents.parser import extract_pdf_pages, fitz, iter_file, parse_file
+
+
+# =====================================================
+# SYNTHETIC CORPUS
+# =====================================================
+
+WORDS = (
+    "account invoice refund policy shipping customer order payment "
+    "contract service vendor report audit budget schedule compliance "
+    "release support ticket region manager quarter review storage"
+).split()
+
+
+def make_pdf(path: str, pages: int, rng):
+    """
+    Text-only PDF, one dense page of prose per page.
+    """
+
+    with fitz.open() as doc:
+        for number in range(pages):
+            page = doc.new_page()
+
+            lines = [f"Section {number + 1}"]
+            for _ in range(60):
+                lines.append(" ".join(rng.choice(WORDS, size=12)))
+
+            page.insert_textbox(page.rect + (36, 36, -36, -36), "\n".join(lines), fontsize=8)
+
+        doc.save(path)
+
+
+# =====================================================
+# MODES
+# =====================================================
+
+def parse_serial(paths):
+    return [parse_file(path) for path in paths]
+
+
+def parse_pool(path) -> str:
+    return "".join(text for _, text in iter_file(path))
+
+
+def parse_pool_files(paths):
+    return [parse_pool(path) for path in paths]
+
+
+def parse_pool_jobs(paths):
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as jobs:
+        return list(jobs.map(parse_pool, paths))
+
+
+MODES = {
+    "serial": parse_serial,
+    "pool": parse_pool_files,
+    "pool+jobs": parse_pool_jobs,
+}
+
+
+def timed(fn, paths, repeat: int):
+    """
+    (result of the last run, best wall time in seconds)
+    """
+
+    best = None
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(paths)
+        elapsed = time.perf_counter() - started
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return result, best
+
+
+# =====================================================
+# MAIN
+# =====================================================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    workdir = tempfile.mkdtemp(prefix="bench_parse_")
+
+    try:
+        paths = []
+
+        for number in range(args.files):
+            path = os.path.join(workdir, f"doc{number}.pdf")
+            make_pdf(path, args.pages, rng)
+            paths.append(path)
+
+        size = sum(os.path.getsize(path) for path in paths)
+        print(
+            f"Corpus: {args.files} PDFs x {args.pages} pages ({size / 1e6:.1f} MB); "
+            f"PARSE_PROCESSES={PARSE_PROCESSES} PDF_PAGES_PER_TASK={PDF_PAGES_PER_TASK} "
+            f"PDF_TASKS_IN_FLIGHT={PDF_TASKS_IN_FLIGHT} INGEST_WORKERS={INGEST_WORKERS} "
+            f"cpus={os.cpu_count()}"
+        )
+
+        # ---------- POOL STARTUP (ONCE PER APP PROCESS) ----------
+        # a one-page extract per task also pays each worker's PyMuPDF import
+        started = time.perf_counter()
+        warm = PARSE_PROCESSES * 4
+        list(get_process_pool().map(
+            extract_pdf_pages, [paths[0]] * warm, [0] * warm, [1] * warm
+        ))
+        print(f"pool startup: {time.perf_counter() - started:.2f} s")
+
+        expected = None
+
+        for name, fn in MODES.items():
+            texts, seconds = timed(fn, paths, args.repeat)
+
+            if expected is None:
+                expected = texts
+                baseline = seconds
+
+            same = "ok" if texts == expected else "MISMATCH"
+
+            print(
+                f"{name:<10} {seconds:7.3f} s  "
+                f"{args.files * args.pages / seconds:8.0f} pages/s  "
+                f"x{baseline / seconds:4.2f} vs serial  text {same}"
+            )
+
+    finally:
+        shutdown_process_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
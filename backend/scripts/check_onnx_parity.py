@@ -0,0 +1,252 @@
+"""
+ONNX backend parity check + benchmark against sentence-transformers.
+
+Run from backend/ (needs torch, sentence-transformers, transformers
+and onnxruntime):
+
+    python -m scripts.check_onnx_parity
+    python -m scripts.check_onnx_parity --variants int8 --sentences 5000
+    ONNX_MODEL_DIR=/models/minilm python -m scripts.check_onnx_parity
+
+For each variant (fp32, int8) the ONNX vectors are compared sentence by
+sentence with SentenceTransformer.encode (normalized, as embed_texts
+does). A variant passes when both its minimum and mean cosine reach
+PARITY_MIN_COSINE / PARITY_MEAN_COSINE in app.rag.onnx_backend:
+
+    fp32  min >= 0.99  mean >= 0.999
+    int8  min >= 0.95  mean >= 0.98
+
+The outcome is written to ONNX_MODEL_DIR/parity.json for that exact model
+file. EMBEDDING_BACKEND=onnx refuses to load without a passing record,
+so run this after every export / quantization. Exit code 1 when a
+variant fails.
+
+Throughput (sentences/sec) and peak RSS are measured per backend in a
+fresh spawned process, so each one's memory is its own.
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.config import ONNX_MODEL_DIR
+from app.rag.onnx_backend import (
+    PARITY_MEAN_COSINE,
+    PARITY_MIN_COSINE,
+    export_model,
+    record_parity,
+)
+
+
+# =====================================================
+# SENTENCES
+# =====================================================
+
+SUBJECTS = ("The invoice", "Our refund policy", "This contract", "The audit report",
+            "Customer support", "The shipping label", "Your account", "The warehouse")
+VERBS = ("covers", "excludes", "requires", "was updated for", "applies to",
+         "does not mention", "is overdue for", "lists")
+OBJECTS = ("damaged goods", "orders above 500 EUR", "the Q3 renewal",
+           "error ERR-4012", "two-factor login", "returns after 30 days",
+           "the Berlin office", "café opening hours", "naïve résumé parsing")
+QUESTIONS = ("What does {o} mean?", "Who approves {o}?", "Is {o} covered?",
+             "how do i handle {o}", "{o}")
+
+
+def make_sentences(count: int, rng):
+    """
+    Short queries, prose sentences and a few inputs longer than
+    MAX_SEQ_LENGTH (truncation must match too).
+    """
+
+    def pick(options):
+        return options[int(rng.integers(len(options)))]
+
+    sentences = []
+
+    for i in range(count):
+        kind = i % 10
+
+        if kind < 3:
+            sentences.append(pick(QUESTIONS).format(o=pick(OBJECTS)))
+
+        elif kind < 9:
+            parts = [f"{pick(SUBJECTS)} {pick(VERBS)} {pick(OBJECTS)}."
+                     for _ in range(int(rng.integers(1, 6)))]
+            sentences.append(" ".join(parts))
+
+        else:
+            parts = [f"{pick(SUBJECTS)} {pick(VERBS)} {pick(OBJECTS)}."
+                     for _ in range(60)]
+            sentences.append(" ".join(parts))
+
+    return sentences
+
+
+# =====================================================
+# ONE BACKEND PER PROCESS
+# =====================================================
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_backend(name: str, model_dir: str, texts, batch: int, threads: int):
+    """
+    Runs in a fresh process. Returns vectors, timings and peak RSS.
+    """
+
+    if name == "torch":
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+    else:
+        import onnxruntime  # noqa: F401 (counted in the baseline)
+        from app.rag.onnx_backend import OnnxEmbedder
+
+    baseline = _peak_rss_mb()
+
+    started = time.perf_counter()
+
+    if name == "torch":
+        model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+
+        def encode(chunk):
+            return model.encode(
+                chunk,
+                batch_size=batch,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            ).astype("float32")
+    else:
+        model = OnnxEmbedder(model_dir, quantize=(name == "int8"), threads=threads)
+
+        def encode(chunk):
+            return model.encode(chunk, batch_size=batch)
+
+    load_s = time.perf_counter() - started
+
+    encode(texts[:batch])   # warmup
+
+    started = time.perf_counter()
+    vectors = encode(texts)
+    encode_s = time.perf_counter() - started
+
+    return {
+        "vectors": vectors,
+        "load_s": load_s,
+        "sentences_per_sec": len(texts) / encode_s,
+        "peak_rss_mb": _peak_rss_mb(),
+        "model_rss_mb": _peak_rss_mb() - baseline,
+    }
+
+
+def in_fresh_process(*args):
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_backend, *args).result()
+
+
+# =====================================================
+# MAIN
+# =====================================================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--variants", default="fp32,int8",
+                        help="comma-separated: fp32, int8")
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0,
+                        help="intra-op threads per backend (0 = library default)")
+    parser.add_argument("--no-record", action="store_true",
+                        help="report only; do not write parity.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+
+    for name in variants:
+        if name not in PARITY_MIN_COSINE:
+            parser.error(f"unknown variant: {name}")
+
+    texts = make_sentences(args.sentences, np.random.default_rng(args.seed))
+
+    # export / quantize up front so it is not timed or counted in RSS
+    for name in variants:
+        export_model(args.model_dir, quantize=(name == "int8"))
+
+    results = {}
+
+    for name in ["torch", *variants]:
+        print(f"Running {name}...")
+        results[name] = in_fresh_process(
+            name, args.model_dir, texts, args.batch, args.threads
+        )
+
+    reference = results["torch"]["vectors"]
+    failed = False
+
+    print(
+        f"\n{'backend':<8} {'sent/s':>9} {'load s':>7} {'peak RSS MB':>12} "
+        f"{'model MB':>9} {'min cos':>8} {'mean cos':>9}  result"
+    )
+
+    for name in ["torch", *variants]:
+        result = results[name]
+        line = (
+            f"{name:<8} {result['sentences_per_sec']:9.0f} {result['load_s']:7.1f} "
+            f"{result['peak_rss_mb']:12.0f} {result['model_rss_mb']:9.0f}"
+        )
+
+        if name == "torch":
+            print(f"{line} {'-':>8} {'-':>9}  reference")
+            continue
+
+        cosine = (result["vectors"] * reference).sum(axis=1)
+        min_cos = float(cosine.min())
+        mean_cos = float(cosine.mean())
+
+        passed = (
+            min_cos >= PARITY_MIN_COSINE[name]
+            and mean_cos >= PARITY_MEAN_COSINE[name]
+        )
+        failed = failed or not passed
+
+        print(f"{line} {min_cos:8.4f} {mean_cos:9.4f}  {'PASS' if passed else 'FAIL'}")
+
+        if not args.no_record:
+            import onnxruntime
+
+            record_parity(args.model_dir, name == "int8", {
+                "passed": passed,
+                "min_cosine": round(min_cos, 5),
+                "mean_cosine": round(mean_cos, 5),
+                "sentences": len(texts),
+                "sentences_per_sec": round(result["sentences_per_sec"], 1),
+                "torch_sentences_per_sec": round(results["torch"]["sentences_per_sec"], 1),
+                "peak_rss_mb": round(result["peak_rss_mb"], 1),
+                "onnxruntime": onnxruntime.__version__,
+                "checked_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            })
+
+    if not args.no_record:
+        print(f"\nParity recorded in {args.model_dir}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.routes import chat
+
+
+RESULTS = [{"document": "a.txt", "doc_id": "d1", "text": "t", "page": None, "score": 0.8}]
+
+
+def _chunk(content, finish_reason=None):
+    delta = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+
+class _Stream:
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        return self._chunks.pop(0)
+
+
+@pytest.fixture
+def puts(monkeypatch):
+    stored = []
+
+    async def fake_retrieve(message, vector_path, timings):
+        return np.zeros((1, 384), dtype="float32"), RESULTS
+
+    monkeypatch.setattr(chat, "retrieve", fake_retrieve)
+    monkeypatch.setattr(chat.answer_cache, "lookup", lambda *a: None)
+    monkeypatch.setattr(chat.answer_cache, "put", lambda *a: stored.append(a[-1]))
+
+    return stored
+
+
+def _stream_with(monkeypatch, chunks):
+    async def create(**kwargs):
+        return _Stream(chunks)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(chat.llm_clients, "get_async", lambda: client)
+
+    async def consume():
+        return [event async for event in chat.stream_answer("q?", "unused", "test")]
+
+    return asyncio.run(consume())
+
+
+def test_complete_stream_is_cached(monkeypatch, puts):
+    events = _stream_with(monkeypatch, [_chunk("Yes"), _chunk(" indeed.", "stop")])
+
+    assert events[-1].startswith("event: done")
+    assert puts == ["Yes indeed."]
+
+
+def test_empty_stream_is_not_cached(monkeypatch, puts):
+    events = _stream_with(monkeypatch, [_chunk(None), _chunk("", "stop")])
+
+    assert events[-1].startswith("event: done")
+    assert puts == []
+
+
+def test_unfinished_stream_is_not_cached(monkeypatch, puts):
+    _stream_with(monkeypatch, [_chunk("Partial")])
+
+    assert puts == []
@@ -0,0 +1,58 @@
+import threading
+
+from app.documents.jobs import IngestionQueue
+
+
+def _queue(tmp_path, monkeypatch):
+    queue = IngestionQueue(str(tmp_path / "jobs.db"), workers=1, lease=60, heartbeat=15)
+
+    # keep jobs queued; only the submit transaction is under test
+    monkeypatch.setattr(queue, "_enqueue", lambda job_id: None)
+
+    return queue
+
+
+def test_concurrent_submits_of_same_bytes_share_one_job(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch)
+
+    barrier = threading.Barrier(8)
+    results = []
+
+    def upload(n):
+        barrier.wait()
+        results.append(queue.submit(
+            user_id="u",
+            doc_id=f"doc-{n}",
+            filename="a.txt",
+            filepath=f"/tmp/a-{n}.txt",
+            vector_path="ws",
+            content_hash="same-bytes",
+        ))
+
+    threads = [threading.Thread(target=upload, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    created = [r for r in results if not r["duplicate"]]
+
+    assert len(created) == 1
+    assert {r["job_id"] for r in results} == {created[0]["job_id"]}
+    assert {r["doc_id"] for r in results} == {created[0]["doc_id"]}
+
+
+def test_same_bytes_in_another_workspace_or_after_finish_get_new_jobs(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch)
+
+    first = queue.submit("u", "d1", "a.txt", "/tmp/a", "ws1", content_hash="h")
+    other = queue.submit("u", "d2", "a.txt", "/tmp/b", "ws2", content_hash="h")
+
+    assert not other["duplicate"]
+
+    queue._update(first["job_id"], status="done")
+
+    again = queue.submit("u", "d3", "a.txt", "/tmp/c", "ws1", content_hash="h")
+
+    assert not again["duplicate"]
+    assert again["job_id"] != first["job_id"]
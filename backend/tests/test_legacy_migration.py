@@ -0,0 +1,83 @@
+import json
+import os
+
+import faiss
+import numpy as np
+
+from app.rag import retrieve, store
+
+
+def _unit(rng, n):
+    vectors = rng.standard_normal((n, retrieve.DIMENSION)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _legacy_workspace(path, rows, vectors):
+    """
+    Pre-ID workspace: metadata.json rows + a positional IndexFlatL2.
+    """
+
+    os.makedirs(path, exist_ok=True)
+
+    with open(os.path.join(path, "metadata.json"), "w") as f:
+        json.dump(rows, f)
+
+    index = faiss.IndexFlatL2(retrieve.DIMENSION)
+    index.add(vectors)
+    faiss.write_index(index, retrieve.get_index_path(path))
+
+
+def _rows(doc_id, count):
+    return [
+        {"doc_id": doc_id, "document": f"{doc_id}.txt", "text": f"{doc_id} chunk {i}"}
+        for i in range(count)
+    ]
+
+
+def test_delete_then_reupload_keys_vectors_to_tail_rows(tmp_path):
+    """
+    Old delete: d1 removed, index recreated empty, d2's rows kept.
+    Re-upload of d3 then appended rows and vectors. The index holds
+    only d3 — the tail of metadata.json.
+    """
+
+    path = str(tmp_path / "ws")
+    rng = np.random.default_rng(0)
+
+    d3_vectors = _unit(rng, 2)
+    _legacy_workspace(path, _rows("d2", 3) + _rows("d3", 2), d3_vectors)
+
+    with retrieve.workspace_lock(path):
+        index = retrieve.load_index_for_write(path)
+
+    assert sorted(retrieve.index_ids(index).tolist()) == [3, 4]
+    assert store.get_chunk_ids(path, "d3") == [3, 4]
+
+    for row, vector in enumerate(d3_vectors):
+        hits = retrieve.search(vector[None, :].copy(), path, k=1)
+        assert hits[0]["doc_id"] == "d3"
+        assert hits[0]["text"] == f"d3 chunk {row}"
+
+    # deleting the vector-less document must not touch d3's vectors
+    assert retrieve.delete_embeddings("d2", path)
+    assert retrieve.read_index(path).ntotal == 2
+
+    assert retrieve.delete_embeddings("d3", path)
+    assert retrieve.read_index(path).ntotal == 0
+
+
+def test_untouched_legacy_workspace_keeps_positions(tmp_path):
+    path = str(tmp_path / "ws")
+    rng = np.random.default_rng(1)
+
+    vectors = _unit(rng, 4)
+    _legacy_workspace(path, _rows("d1", 2) + _rows("d2", 2), vectors)
+
+    with retrieve.workspace_lock(path):
+        index = retrieve.load_index_for_write(path)
+
+    assert sorted(retrieve.index_ids(index).tolist()) == [0, 1, 2, 3]
+
+    hits = retrieve.search(vectors[2:3].copy(), path, k=1)
+    assert hits[0]["text"] == "d2 chunk 0"
@@ -2,6 +2,7 @@ import { useEffect, useState } from "react";
 import {
   getDocuments,
   uploadFiles,
+  waitForUploadJobs,
   deleteDocument,
 } from "../services/api";
 
@@ -34,9 +35,12 @@ export default function DocumentSidebar() {
     try {
       setUploading(true);
 
-      await uploadFiles(files);
+      const res = await uploadFiles(files);
 
-      await loadDocs(); // refresh instantly
+      // ingestion runs in background jobs
+      await waitForUploadJobs(res?.uploaded);
+
+      await loadDocs();
       e.target.value = "";
     } catch (err) {
       console.error(err);
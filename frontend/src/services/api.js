@@ -35,6 +35,37 @@ export const uploadFiles = async (files) => {
   return res.data;
 };
 
+/* ---------- INGESTION JOBS ---------- */
+export const getUploadJob = async (jobId) => {
+  const res = await API.get(`/upload/jobs/${jobId}`);
+  return res.data;
+};
+
+// Polls until every uploaded file has finished (done or failed),
+// giving up after timeoutMs
+export const waitForUploadJobs = async (
+  uploaded,
+  intervalMs = 1000,
+  timeoutMs = 10 * 60 * 1000
+) => {
+  let pending = (uploaded || []).map((u) => u.job_id).filter(Boolean);
+  const deadline = Date.now() + timeoutMs;
+
+  while (pending.length) {
+    if (Date.now() > deadline) {
+      throw new Error(`Ingestion still pending for ${pending.length} file(s)`);
+    }
+
+    await new Promise((r) => setTimeout(r, intervalMs));
+
+    const jobs = await Promise.all(pending.map(getUploadJob));
+
+    pending = jobs
+      .filter((j) => j.status === "queued" || j.status === "running")
+      .map((j) => j.job_id);
+  }
+};
+
 /* ---------- DELETE ---------- */
 export const deleteDocument = async (docId) => {
   if (!docId) throw new Error("Invalid document id");